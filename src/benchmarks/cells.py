@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import tracemalloc
+
+#Allow the benchmark to import the application modules directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/reverseastar')
+
+import algorithm
+import model
+
+#Measures the memory used per world cell and the time spent per node
+#expansion of the Reverse A* search on a large grid.
+#
+#Usage: python cells.py [numRows] [numColumns] [density]
+
+def buildWorld(numRows, numCols, density, seed=0):
+    '''
+    Creates a random world of the given size.
+    '''
+    world = model.WorldModel(numRows, numCols)
+    world.reset(density, seed=seed)
+    return world
+
+def measureMemory(numRows, numCols, density):
+    '''
+    Returns the bytes allocated per cell by the world model and by a single
+    cell view.
+    '''
+    tracemalloc.start()
+    world = buildWorld(numRows, numCols, density)
+    #The search arrays are only allocated once a search needs them
+    world.getDistanceTraveledArray()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return allocated / float(numRows * numCols), sys.getsizeof(world.getCell(0, 0))
+
+def measureSearch(world):
+    '''
+    Runs the search to completion and returns the number of expanded cells
+    and the total run time.
+    '''
+    alg = algorithm.ReverseAStarAlgorithm(world)
+    begin = time.perf_counter()
+    alg.reset()
+    while not alg.isDone() and alg.isSolvable():
+        alg.step()
+    elapsed = time.perf_counter() - begin
+    return len(alg.getVisitedCells()), elapsed
+
+if __name__ == '__main__':
+    numRows = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    numCols = int(sys.argv[2]) if len(sys.argv) > 2 else numRows
+    density = float(sys.argv[3]) if len(sys.argv) > 3 else 0.3
+
+    bytesPerCell, viewSize = measureMemory(numRows, numCols, density)
+    print('grid: {0}x{1} ({2} cells)'.format(numRows, numCols, numRows * numCols))
+    print('world memory: {0:.1f} bytes/cell'.format(bytesPerCell))
+    print('cell view: {0} bytes'.format(viewSize))
+
+    expanded, elapsed = measureSearch(buildWorld(numRows, numCols, density))
+    print('expanded: {0} cells in {1:.2f} s'.format(expanded, elapsed))
+    if expanded > 0:
+        print('per expansion: {0:.2f} us'.format(elapsed / expanded * 1e6))
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from statistics import median
+
+#Allow the benchmark to import the application modules directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/reverseastar')
+
+import algorithm
+import model
+
+#Sweeps grid sizes, obstacle densities and seeds and writes one JSON result
+#per world with the world generation time, the time to solution, the nodes
+#expanded per second and the peak memory of generating and solving it.
+#Results saved from an earlier run can be given with --baseline to flag
+#worlds that are solved differently, which fails the run, or got slower or
+#use more memory, which is only reported unless --fail-on-timing is given.
+#
+#Usage: python suite.py --output before.jsonl
+#       python suite.py --baseline before.jsonl --output after.jsonl
+
+_DEFAULT_SIZES = '33,128,512,1024'
+_DEFAULT_DENSITIES = '0.1,0.2,0.3'
+_DEFAULT_SEEDS = '0,1,2'
+_DEFAULT_REPEAT = 5
+
+#Metrics compared against a baseline, lower is better for all of them.
+#Each has an absolute noise floor that a change must exceed before the
+#relative tolerance is applied, so that timings of small worlds that jitter
+#by a large fraction of almost nothing are not flagged.
+_TIMED_METRICS = {'genSeconds': 0.005,
+                  'solveSeconds': 0.005,
+                  'peakBytes': 64 * 1024}
+
+#Metrics that must match the baseline exactly.  They do not depend on the
+#machine or its load, so a difference means the search itself changed.
+_EXACT_METRICS = ('start', 'end', 'solvable', 'cost', 'expanded', 'generated')
+
+def generate(numRows, numCols, density, seed):
+    '''
+    Generates the world of one benchmark case.
+    '''
+    world = model.WorldModel(numRows, numCols)
+    world.reset(density, seed=seed)
+    return world
+
+def solve(world, stats=None):
+    '''
+    Runs the search on the world to completion and returns the algorithm.
+    '''
+    alg = algorithm.ReverseAStarAlgorithm(world, stats)
+    alg.reset()
+    alg.solve()
+    return alg
+
+def runCase(numRows, numCols, density, seed, repeat=_DEFAULT_REPEAT, measureMemory=True):
+    '''
+    Benchmarks a single world and returns its result dictionary.  Times are
+    the median of repeat runs.  The search counters and the memory are
+    measured in a separate run because counting and tracing allocations
+    slow everything down.
+    '''
+    genTimes = []
+    solveTimes = []
+    for _ in range(0, max(1, repeat)):
+        begin = time.perf_counter()
+        world = generate(numRows, numCols, density, seed)
+        genTimes.append(time.perf_counter() - begin)
+
+        begin = time.perf_counter()
+        alg = solve(world)
+        solveTimes.append(time.perf_counter() - begin)
+    genSeconds = median(genTimes)
+    solveSeconds = median(solveTimes)
+
+    start = world.getStartCell()
+    end = world.getEndCell()
+    expanded = alg.getNumVisitedCells()
+    result = {'rows': numRows,
+              'cols': numCols,
+              'density': density,
+              'seed': seed,
+              'start': [start.row, start.column],
+              'end': [end.row, end.column],
+              'solvable': alg.isSolvable(),
+              'cost': start.distanceTraveledToCell if alg.isDone() else None,
+              'expanded': expanded,
+              'generated': None,
+              'genSeconds': genSeconds,
+              'solveSeconds': solveSeconds,
+              'expansionsPerSecond': expanded / solveSeconds if solveSeconds > 0 else None,
+              'peakBytes': None}
+
+    del world, alg
+    stats = algorithm.SearchStats()
+    if measureMemory:
+        tracemalloc.start()
+    try:
+        solve(generate(numRows, numCols, density, seed), stats)
+        if measureMemory:
+            result['peakBytes'] = tracemalloc.get_traced_memory()[1]
+    finally:
+        if measureMemory:
+            tracemalloc.stop()
+    result['generated'] = stats.generated
+    return result
+
+def caseKey(result):
+    return (result['rows'], result['cols'], result['density'], result['seed'])
+
+def readResults(path):
+    '''
+    Reads saved benchmark results keyed by their case.
+    '''
+    with open(path) as resultFile:
+        return dict((caseKey(result), result) for result in
+                    (json.loads(line) for line in resultFile if line.strip()))
+
+def compareResult(result, baseline, tolerance):
+    '''
+    Returns two lists of messages describing how the result differs from its
+    baseline: the search counters and outcome that changed, and the timings
+    and memory that got worse by more than their noise floor and tolerance
+    (a fraction).  Metrics missing from the baseline are not compared.
+    '''
+    changes = []
+    for metric in _EXACT_METRICS:
+        if metric in baseline and result[metric] != baseline[metric]:
+            changes.append('{0} changed from {1} to {2}'.format(
+                metric, baseline[metric], result[metric]))
+    slowdowns = []
+    for metric, noiseFloor in sorted(_TIMED_METRICS.items()):
+        current = result[metric]
+        previous = baseline.get(metric)
+        if current is None or not previous:
+            continue
+        if current - previous > noiseFloor and current > previous * (1.0 + tolerance):
+            slowdowns.append('{0} {1:.4g} -> {2:.4g} ({3:+.0%})'.format(
+                metric, previous, current, current / previous - 1.0))
+    return changes, slowdowns
+
+def _parseList(convert):
+    def parse(text):
+        try:
+            return [convert(item) for item in text.split(',') if item]
+        except ValueError:
+            raise argparse.ArgumentTypeError("expected a comma separated list, got '{0}'".format(text))
+    return parse
+
+def _buildArgParser():
+    parser = argparse.ArgumentParser(
+        description='Benchmark world generation and the Reverse A* search '
+                    'across grid sizes, densities and seeds.')
+    parser.add_argument('--sizes', type=_parseList(int), default=_parseList(int)(_DEFAULT_SIZES),
+                        help='square grid sizes (default {0})'.format(_DEFAULT_SIZES))
+    parser.add_argument('--densities', type=_parseList(float),
+                        default=_parseList(float)(_DEFAULT_DENSITIES),
+                        help='obstacle densities (default {0})'.format(_DEFAULT_DENSITIES))
+    parser.add_argument('--seeds', type=_parseList(int), default=_parseList(int)(_DEFAULT_SEEDS),
+                        help='world seeds (default {0})'.format(_DEFAULT_SEEDS))
+    parser.add_argument('--repeat', type=int, default=_DEFAULT_REPEAT,
+                        help='runs per world, the median time is kept '
+                             '(default {0})'.format(_DEFAULT_REPEAT))
+    parser.add_argument('--no-memory', action='store_false', dest='measureMemory',
+                        help='skip the peak memory measurement')
+    parser.add_argument('--baseline',
+                        help='results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slow down against the baseline as a '
+                             'fraction (default 0.25)')
+    parser.add_argument('--fail-on-timing', action='store_true', dest='failOnTiming',
+                        help='also fail when a world got slower or uses more '
+                             'memory, not only when it is solved differently')
+    parser.add_argument('--output', default='-',
+                        help='file to write the results to (default stdout)')
+    return parser
+
+def main(argv=None):
+    args = _buildArgParser().parse_args(argv)
+    baseline = readResults(args.baseline) if args.baseline else None
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    numRegressions = 0
+    try:
+        for size in args.sizes:
+            for density in args.densities:
+                for seed in args.seeds:
+                    result = runCase(size, size, density, seed, args.repeat,
+                                     args.measureMemory)
+                    output.write(json.dumps(result, sort_keys=True) + '\n')
+                    output.flush()
+
+                    if baseline is None:
+                        continue
+                    previous = baseline.get(caseKey(result))
+                    if previous is None:
+                        sys.stderr.write('{0}: no baseline\n'.format(caseKey(result)))
+                        continue
+                    changes, slowdowns = compareResult(result, previous, args.tolerance)
+                    if changes or (slowdowns and args.failOnTiming):
+                        numRegressions += 1
+                    if changes or slowdowns:
+                        sys.stderr.write('{0}: {1}\n'.format(caseKey(result),
+                                                             '; '.join(changes + slowdowns)))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if baseline is not None:
+        sys.stderr.write('{0} regressed case(s)\n'.format(numRegressions))
+    return 1 if numRegressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,139 +1,473 @@
+from heapq import heappop
+from heapq import heappush
+from itertools import count
 from math import sqrt
+from time import perf_counter
+
+#Per-cell search state flags.  A cell that was investigated and later found
+#to be reachable more cheaply carries both flags until it is popped again.
+_OPEN = 1
+_CLOSED = 2
+
+class SearchStats(object):
+    '''
+    Counters collected by a search that was given a stats object.  They are
+    cleared whenever the search is reset.
+
+    expanded        cells popped from the open set and explored
+    generated       neighbors that were given a new, cheaper path
+    reopens         generated neighbors that had already been explored
+    peakOpen        largest number of active cells at once
+    heuristicEvals  calls of the heuristic
+    resetSeconds    wall time spent in reset()
+    searchSeconds   wall time spent in step(), without the step callback
+    '''
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.expanded = 0
+        self.generated = 0
+        self.reopens = 0
+        self.peakOpen = 0
+        self.heuristicEvals = 0
+        self.resetSeconds = 0.0
+        self.searchSeconds = 0.0
+
+    def asDict(self):
+        return {'expanded': self.expanded,
+                'generated': self.generated,
+                'reopens': self.reopens,
+                'peakOpen': self.peakOpen,
+                'heuristicEvals': self.heuristicEvals,
+                'resetSeconds': self.resetSeconds,
+                'searchSeconds': self.searchSeconds}
 
 class ReverseAStarAlgorithm(object):
-    
-    def __init__(self, model):
+    '''
+    Searches from the world's end cell back to its start cell.  Cells are
+    tracked by their index in the world model's flat arrays so the search
+    loop reads and writes plain array slots instead of WorldCell attributes.
+    '''
+
+    def __init__(self, model, stats=None, heuristic=None):
         self._worldModel = model
         self._closedSet = []
-        self._openSet = []
+        self._openHeap = []
+        self._numOpen = 0
+        self._cellState = bytearray()
+        self._tieBreaker = count()
         self._current = None
         self._done = False
         self._isSolvable = True
         self._startCell = None
         self._endCell = None
-        
+        self._endIndex = -1
+        self._stats = None
+        self._stepCallback = None
+        self._heuristicSource = heuristic
+        self._estimate = None
+        self.setStats(stats)
+
+    def setHeuristic(self, heuristic):
+        '''
+        Use the heuristic (see the heuristics module) from the next reset() on,
+        or the straight line distance if heuristic is None.
+        '''
+        self._heuristicSource = heuristic
+
+    def getHeuristic(self):
+        return self._heuristicSource
+
+    def setStats(self, stats):
+        '''
+        Collect search counters and timings into the given SearchStats object,
+        or stop collecting them if stats is None.
+        '''
+        self._stats = stats
+        self._updateStepMethod()
+
+    def getStats(self):
+        return self._stats
+
+    def setStepCallback(self, callback):
+        '''
+        Call callback(algorithm) at the end of every step(), or stop calling
+        it if callback is None.
+        '''
+        self._stepCallback = callback
+        self._updateStepMethod()
+
+    def _updateStepMethod(self):
+        '''
+        Routes step() through the instrumented version only while stats or a
+        callback are set, so a search without them runs the plain loop.
+        '''
+        if self._stats is not None or self._stepCallback is not None:
+            self.step = self._instrumentedStep
+        else:
+            self.__dict__.pop('step', None)
+
     def reset(self):
         '''
         Reset the algorithm to solve another world model.
         '''
+        stats = self._stats
+        if stats is not None:
+            stats.clear()
+            begin = perf_counter()
+            self._reset()
+            stats.resetSeconds = perf_counter() - begin
+            if self._numOpen > 0:
+                stats.heuristicEvals = 1
+                stats.peakOpen = 1
+        else:
+            self._reset()
+
+    def _reset(self):
+        model = self._worldModel
         self._closedSet = []
-        self._openSet = []
+        self._openHeap = []
+        self._numOpen = 0
+        self._cellState = bytearray(model.getNumRows() * model.getNumColumns())
+        self._tieBreaker = count()
         self._current = None
         self._done = False
         self._isSolvable = True
-        
+
+        #The model replaces its arrays when a new world is generated so grab
+        #the current ones for the search loop.
+        self._distTraveled = model.getDistanceTraveledArray()
+        self._pathCost = model.getEstimatedCostArray()
+        self._cameFrom = model.getPrevCellArray()
+        self._moveMasks = model.getMoveMasks()
+        self._moveTable = model.getMoveTable()
+
         #Reverse A* is just like A*, but with the start and end cells swapped
-        startCell = self._worldModel.getEndCell()
-        self._endCell = self._worldModel.getStartCell()
-        
-        startCell.distanceTraveledToCell = 0
-        startCell.estimatedPathCostToCell = 0 + self._heuristic(self._endCell)
-        self._openSet.append(startCell)
-    
+        startCell = model.getEndCell()
+        self._startCell = startCell
+        self._endCell = model.getStartCell()
+        self._endIndex = model.getCellIndex(self._endCell.row, self._endCell.column)
+
+        #Worlds whose start and end cells sit in different connected regions
+        #are known to be unsolvable without expanding a single cell.  Labels
+        #dropped by an obstacle edit are not recomputed for this, the search
+        #finds out.
+        if model.isKnownUnsolvable():
+            self._isSolvable = False
+            return
+
+        if self._heuristicSource is not None:
+            self._estimate = self._heuristicSource.bind(model, self._endIndex)
+        else:
+            self._estimate = None
+
+        startIndex = model.getCellIndex(startCell.row, startCell.column)
+        self._distTraveled[startIndex] = 0
+        self._cameFrom[startIndex] = -1
+        self._pathCost[startIndex] = 0 + self._heuristic(startIndex)
+        self._addToOpenSet(startIndex)
+
     def step(self):
         '''
         Run a single iteration of the A* algorithm.  Will set the 'done' and
         'solvable' flags if needed at the end of each iteration.  This method
         does nothing if algorithm has already solved the world puzzle.
         '''
-        #Check if we still have cells to investigate
-        if len(self._openSet) > 0 and not self._done:
-            self._current = self._lowestEstimatedCost()
+        self._expand(1, None, None)
+
+    def solve(self, maxExpansions=None, timeBudget=None):
+        '''
+        Runs the search after reset() until it finds the path, proves the
+        world unsolvable, has expanded maxExpansions more cells or has run for
+        timeBudget seconds.  Returns (getPath(), getPathCost()), which are
+        (None, None) if no path was found (yet).  A search stopped by a limit can be
+        continued with step() or another call to solve().
+        '''
+        if self._stats is not None or self._stepCallback is not None:
+            self._solveBySteps(maxExpansions, timeBudget)
+        else:
+            deadline = None if timeBudget is None else perf_counter() + timeBudget
+            self._expand(maxExpansions, deadline, None)
+        return self.getPath(), self.getPathCost()
+
+    def _expand(self, maxExpansions, deadline, stats):
+        '''
+        The search loop of both step() and solve().  Expands cells until the
+        goal is found, no active cells are left, maxExpansions cells were
+        expanded (None for no limit) or the perf_counter() deadline passed.
+        The counters of stats are updated unless it is None.
+        '''
+        if self._done or not self._isSolvable:
+            return
+
+        #Everything the loop touches is kept in locals
+        openHeap = self._openHeap
+        cellState = self._cellState
+        closedAppend = self._closedSet.append
+        distTraveled = self._distTraveled
+        pathCost = self._pathCost
+        cameFrom = self._cameFrom
+        moveTable = self._moveTable
+        moveMasks = self._moveMasks
+        nextTie = self._tieBreaker.__next__
+        numCols = self._worldModel.getNumColumns()
+        endIndex = self._endIndex
+        endRow, endCol = divmod(endIndex, numCols)
+        estimate = self._estimate
+        numOpen = self._numOpen
+        current = self._current
+        done = False
+
+        limit = -1 if maxExpansions is None else maxExpansions
+        numExpanded = 0
+
+        while numOpen > 0:
+            if numExpanded == limit:
+                break
+            #Checking the clock on every expansion would cost more than the
+            #expansion itself
+            if deadline is not None and not numExpanded & 1023 and perf_counter() >= deadline:
+                break
+
+            #Move the currently estimated lowest cost cell from active to
+            #inactive, skipping stale heap entries
+            while True:
+                cost, _, current = heappop(openHeap)
+                if cellState[current] & _OPEN and cost == pathCost[current]:
+                    break
+            numOpen -= 1
+            if not cellState[current] & _CLOSED:
+                closedAppend(current)
+            cellState[current] = _CLOSED
+            numExpanded += 1
+            if stats is not None:
+                stats.expanded += 1
+
             #Bail out of the algorithm if we find the goal
-            if self._current == self._endCell:
-                self._done = True
-                
-            #Move the currently estimated lowest cost path/cell from active to
-            #inactive.
-            self._openSet.remove(self._current)
-            self._closedSet.append(self._current)
-            
-            #Compute path costs for all the traversable neighbors of the current cell 
-            for neighbor in self._worldModel.getTraversableNeighbors(self._current.row, self._current.column):
-                currentDist = self._current.distanceTraveledToCell + self._distBetweenCells(self._current, neighbor)
-                
-                #If the neighbor has already been investigated and our current
-                #cost is greater, then this is not the optimal path. Bail out
-                #early and try another neighbor.
-                if neighbor in self._closedSet and currentDist >= neighbor.distanceTraveledToCell:
+            if current == endIndex:
+                done = True
+                break
+
+            #Compute path costs for all the traversable neighbors of the current cell
+            currentDist = distTraveled[current]
+            for offset, stepCost in moveTable[moveMasks[current]]:
+                neighbor = current + offset
+                state = cellState[neighbor]
+                neighborDist = currentDist + stepCost
+
+                #Explored or active neighbors only change for a cheaper path
+                if state and neighborDist >= distTraveled[neighbor]:
                     continue
-                
-                #If the neighbor is not active or our current path is cheaper than
-                #the neighbor then we need to continue investigating this path.
-                if neighbor not in self._openSet or currentDist < neighbor.distanceTraveledToCell:
-                    neighbor.prevCellInPath = self._current
-                    neighbor.distanceTraveledToCell = currentDist
-                    neighbor.estimatedPathCostToCell = currentDist + self._heuristic(neighbor)
-                    if neighbor not in self._openSet:
-                        self._openSet.append(neighbor)
-        elif len(self._openSet) == 0 and not self._done:
-            #If we're not done and we have no more active cells then the
-            #world puzzle isn't solvable.
+
+                cameFrom[neighbor] = current
+                distTraveled[neighbor] = neighborDist
+                if estimate is None:
+                    vert, horz = divmod(neighbor, numCols)
+                    vert -= endRow
+                    horz -= endCol
+                    cost = neighborDist + sqrt(vert * vert + horz * horz)
+                else:
+                    cost = neighborDist + estimate(neighbor)
+                pathCost[neighbor] = cost
+
+                #A cell that is already active is simply pushed again with
+                #its lower cost.  The stale heap entry is skipped when popped.
+                if not state & _OPEN:
+                    cellState[neighbor] = state | _OPEN
+                    numOpen += 1
+                heappush(openHeap, (cost, nextTie(), neighbor))
+                if stats is not None:
+                    stats.generated += 1
+                    stats.heuristicEvals += 1
+                    if state & _CLOSED:
+                        stats.reopens += 1
+
+            if stats is not None and numOpen > stats.peakOpen:
+                stats.peakOpen = numOpen
+
+        self._numOpen = numOpen
+        self._current = current
+        self._done = done
+        #If we're not done and we have no more active cells then the world
+        #puzzle isn't solvable.
+        if numOpen == 0 and not done:
             self._isSolvable = False
-    
-    def _lowestEstimatedCost(self):
-        '''
-        Examines the currently active cells and returns the cell with the lowest
-        estimated cost to the goal.
-        '''
-        lowestCost = None
-        
-        for cell in self._openSet:
-            if lowestCost == None:
-                lowestCost = cell
-            elif cell.estimatedPathCostToCell < lowestCost.estimatedPathCostToCell:
-                lowestCost = cell
-        
-        return lowestCost
-    
-    def _heuristic(self, fromCell):
+
+    def _solveBySteps(self, maxExpansions, timeBudget):
+        '''
+        solve() while stats or a step callback are set, so that every step is
+        counted and reported.
+        '''
+        deadline = None if timeBudget is None else perf_counter() + timeBudget
+        numSteps = 0
+        while not self._done and self._isSolvable:
+            if numSteps == maxExpansions:
+                break
+            if deadline is not None and perf_counter() >= deadline:
+                break
+            self.step()
+            numSteps += 1
+
+    def _instrumentedStep(self):
+        '''
+        step() while stats or a step callback are set.
+        '''
+        stats = self._stats
+        if stats is not None:
+            begin = perf_counter()
+            self._countedStep(stats)
+            stats.searchSeconds += perf_counter() - begin
+        else:
+            type(self).step(self)
+
+        if self._stepCallback is not None:
+            self._stepCallback(self)
+
+    def _countedStep(self, stats):
+        self._expand(1, None, stats)
+
+    def _addToOpenSet(self, index):
+        '''
+        Marks the cell as active and queues it by its current estimated cost.
+        Cells with equal costs are ordered by insertion so that runs are
+        deterministic.
+        '''
+        if not self._cellState[index] & _OPEN:
+            self._cellState[index] |= _OPEN
+            self._numOpen += 1
+        heappush(self._openHeap, (self._pathCost[index],
+                                  next(self._tieBreaker), index))
+
+    def _popLowestEstimatedCost(self):
+        '''
+        Removes and returns the index of the active cell with the lowest
+        estimated cost to the goal.  Heap entries left behind by a cost
+        decrease or by a cell that was already popped are discarded along
+        the way.
+        '''
+        while self._openHeap:
+            cost, _, index = heappop(self._openHeap)
+            if self._isOpenEntry(cost, index):
+                self._numOpen -= 1
+                return index
+        return None
+
+    def _isOpenEntry(self, cost, index):
+        '''
+        Checks if a heap entry still describes an active cell at its current
+        estimated cost.
+        '''
+        return self._cellState[index] & _OPEN and cost == self._pathCost[index]
+
+    def _heuristic(self, fromIndex):
         '''
         A simple heuristic that just computes the distance from the given cell
-        to the goal cell.
+        to the goal cell, unless another heuristic was set.
         '''
-        return self._distBetweenCells(fromCell, self._endCell)
-        
-    def _distBetweenCells(self, src, dest):
+        if self._estimate is not None:
+            return self._estimate(fromIndex)
+        row, col = divmod(fromIndex, self._worldModel.getNumColumns())
+        return self._distBetweenCells(row, col, self._endCell.row, self._endCell.column)
+
+    def _distBetweenCells(self, srcRow, srcCol, destRow, destCol):
         '''
         Computes the cartesian distance (hypotenuse of a right triangle)
         between two cells.
         '''
-        vert = src.row - dest.row
-        horz = src.column - dest.column
-        
+        vert = srcRow - destRow
+        horz = srcCol - destCol
+
         #Square and convert to floating point
         vert = vert * vert * 1.0
         horz = horz * horz * 1.0
-        
+
         return sqrt(vert + horz)
-    
+
     def getVisitedCells(self):
         '''
         Get a set of all the world cells that have been visited and fully
         explored.  These cells are no longer part of the active path search.
         '''
-        return self._closedSet
-    
+        return [self._worldModel.getCellByIndex(index) for index in self._closedSet]
+
+    def getNumVisitedCells(self):
+        '''
+        Get the number of world cells that have been visited and fully
+        explored.
+        '''
+        return len(self._closedSet)
+
     def getActiveCells(self):
         '''
         Get a set of all currently active cells that are part of the current
         path search.  These cells and their neighbors are not yet fully explored.
         '''
-        return self._openSet
-    
+        active = set()
+        for cost, _, index in self._openHeap:
+            if self._isOpenEntry(cost, index):
+                active.add(index)
+        return [self._worldModel.getCellByIndex(index) for index in active]
+
+    def getPath(self):
+        '''
+        Get the path found from the start cell to the end cell as a flat array
+        of row, column pairs: [row0, col0, row1, col1, ...].  Returns None
+        until the search is done.
+        '''
+        if not self._done:
+            return None
+        return self._tracePath(self._endIndex)
+
+    def getPathCost(self):
+        '''
+        Get the cost of the path found, or None until the search is done.
+        '''
+        if not self._done:
+            return None
+        return self._distTraveled[self._endIndex]
+
+    def getCurrentPath(self):
+        '''
+        Get the cheapest known path from the current cell to the end cell as
+        a flat array of row, column pairs like getPath(), or None before the
+        first step.
+        '''
+        if self._current is None:
+            return None
+        return self._tracePath(self._current)
+
+    def _tracePath(self, index):
+        '''
+        Follows the previous cell links from the cell at the index to the
+        root of the search.  Since the search runs backwards from the end
+        cell this leads forward along the path.
+        '''
+        return self._worldModel.tracePath(self._cameFrom, index)
+
     def getCurrentCell(self):
-        return self._current
-    
+        if self._current is None:
+            return None
+        return self._worldModel.getCellByIndex(self._current)
+
+    def getEstimatedCost(self, cell):
+        '''
+        Get the estimated cost of a path through a reached cell, the key the
+        search orders its active cells by.
+        '''
+        return self._pathCost[cell.row * self._worldModel.getNumColumns() + cell.column]
+
     def isSolvable(self):
         '''
         Returns a boolean flag indicating if the algorithm believes the world
         model is still solvable.
         '''
         return self._isSolvable
-    
+
     def isDone(self):
         '''
         Returns a boolean flag indicating if the algorithm has found a path from
         the start node to the end node.
         '''
-        return self._done
\ No newline at end of file
+        return self._done
@@ -0,0 +1,254 @@
+from heapq import heapify
+from heapq import heappop
+
+import algorithm
+from algorithm import _CLOSED
+from algorithm import _OPEN
+from model import _DIAGONAL_COST
+
+#Cells whose cost dropped after they were explored in the current pass.
+#They wait for the next pass instead of being explored again.
+_INCONSISTENT = 4
+
+#Cells explored in any pass, so getVisitedCells() lists them once
+_EXPLORED = 8
+
+class AnytimeReverseAStar(algorithm.ReverseAStarAlgorithm):
+    '''
+    Anytime Repairing A* (ARA*, Likhachev, Gordon and Thrun) searching from
+    the end cell like ReverseAStarAlgorithm.  The first pass weights the
+    heuristic by the initial weight, which finds a path after expanding few
+    cells.  Every following pass lowers the weight by weightStep and
+    improves the path, reusing the costs of the cells found so far so only
+    the cells whose costs dropped are explored again.  The pass with a
+    weight of 1 finds the cheapest path and completes the search.
+
+    After every pass getPath() and getPathCost() return the best path found
+    so far and getSuboptimalityBound() a factor by which it costs at most
+    more than the cheapest path.  A caller with a deadline can run solve()
+    with a time budget and take the best path when it runs out; solve() and
+    step() continue the refinement later.  isDone() is only set once the
+    path is known to be the cheapest.
+    '''
+
+    def __init__(self, model, stats=None, heuristic=None, weight=3.0, weightStep=0.5):
+        if weight < 1.0:
+            raise ValueError('The heuristic weight must be at least 1')
+        if weightStep <= 0.0:
+            raise ValueError('The weight step must be positive')
+        self._initialWeight = weight
+        self._weightStep = weightStep
+        self._weight = weight
+        self._bound = None
+        self._solution = None
+        self._solutionCost = None
+        self._passClosed = []
+        self._inconsistent = []
+        algorithm.ReverseAStarAlgorithm.__init__(self, model, stats, heuristic)
+
+    def _reset(self):
+        algorithm.ReverseAStarAlgorithm._reset(self)
+        self._weight = self._initialWeight
+        self._bound = None
+        self._solution = None
+        self._solutionCost = None
+        self._passClosed = []
+        self._inconsistent = []
+        if self._numOpen == 0:
+            return
+
+        #Queue the root again with the weighted estimate
+        startIndex = self._openHeap[0][2]
+        self._openHeap = []
+        self._numOpen = 0
+        self._cellState[startIndex] = 0
+        self._pathCost[startIndex] = self._weight * self._heuristic(startIndex)
+        self._addToOpenSet(startIndex)
+
+    def getWeight(self):
+        '''
+        Get the heuristic weight of the current pass.
+        '''
+        return self._weight
+
+    def getSuboptimalityBound(self):
+        '''
+        Get the factor by which the best path found so far costs at most more
+        than the cheapest path, or None before the first path is found.
+        '''
+        return self._bound
+
+    def step(self):
+        '''
+        Run a single iteration of the current pass.  A pass ends once no
+        active cell could lead to a cheaper path at its weight, then the best
+        path and the bound are updated and the next pass begins.  Will set
+        the 'done' and 'solvable' flags if needed.  This method does nothing
+        if the cheapest path is already known.
+        '''
+        self._anytimeStep(None)
+
+    def _countedStep(self, stats):
+        self._anytimeStep(stats)
+
+    def solve(self, maxExpansions=None, timeBudget=None):
+        '''
+        Runs passes after reset() like ReverseAStarAlgorithm.solve() until the
+        cheapest path is found or a limit is reached.  Returns the best path
+        found so far and its cost.
+        '''
+        self._solveBySteps(maxExpansions, timeBudget)
+        return self.getPath(), self.getPathCost()
+
+    def _anytimeStep(self, stats):
+        if self._done or not self._isSolvable:
+            return
+        cellState = self._cellState
+        distTraveled = self._distTraveled
+        pathCost = self._pathCost
+        cameFrom = self._cameFrom
+        endIndex = self._endIndex
+
+        #The end cell's key has no estimate, so once no key is lower nothing
+        #could lead to a cheaper path at this weight
+        lowestKey = self._lowestKey()
+        if lowestKey is None or (cellState[endIndex] and distTraveled[endIndex] <= lowestKey):
+            self._finishPass()
+            return
+
+        current = self._popLowestEstimatedCost()
+        self._current = current
+        if not cellState[current] & _EXPLORED:
+            self._closedSet.append(current)
+        cellState[current] = _CLOSED | _EXPLORED
+        self._passClosed.append(current)
+        if stats is not None:
+            stats.expanded += 1
+
+        weight = self._weight
+        currentDist = distTraveled[current]
+        for offset, stepCost in self._moveTable[self._moveMasks[current]]:
+            neighbor = current + offset
+            state = cellState[neighbor]
+            neighborDist = currentDist + stepCost
+            if state and neighborDist >= distTraveled[neighbor]:
+                continue
+
+            cameFrom[neighbor] = current
+            distTraveled[neighbor] = neighborDist
+            if state & _CLOSED:
+                if not state & _INCONSISTENT:
+                    cellState[neighbor] = state | _INCONSISTENT
+                    self._inconsistent.append(neighbor)
+            else:
+                pathCost[neighbor] = neighborDist + weight * self._heuristic(neighbor)
+                self._addToOpenSet(neighbor)
+                if stats is not None:
+                    stats.heuristicEvals += 1
+            if stats is not None:
+                stats.generated += 1
+                if state & _EXPLORED:
+                    stats.reopens += 1
+
+        if stats is not None and self._numOpen > stats.peakOpen:
+            stats.peakOpen = self._numOpen
+
+    def _lowestKey(self):
+        '''
+        Returns the lowest key of an active cell, or None if there are no
+        active cells.  Stale heap entries are discarded.
+        '''
+        openHeap = self._openHeap
+        while openHeap:
+            cost, _, index = openHeap[0]
+            if self._isOpenEntry(cost, index):
+                return cost
+            heappop(openHeap)
+        return None
+
+    def _finishPass(self):
+        '''
+        Records the path of the pass that just ended and the bound on its
+        cost, then starts the next pass with a lower weight.
+        '''
+        cellState = self._cellState
+        distTraveled = self._distTraveled
+        pathCost = self._pathCost
+        endIndex = self._endIndex
+        if not cellState[endIndex]:
+            #Nothing is left to explore and the end cell was never reached
+            self._isSolvable = False
+            return
+
+        #Costs lowered during the pass may not have reached the end cell yet,
+        #so the cost of the path is added up instead of read from it
+        path = self._tracePath(endIndex)
+        cost = self._traceCost(path)
+        if self._solutionCost is None or cost < self._solutionCost:
+            self._solution = path
+            self._solutionCost = cost
+
+        #No path can cost less than the lowest unweighted estimate of a cell
+        #that is still active or waiting for the next pass
+        pending = self._pendingCells()
+        lowest = min([distTraveled[index] + self._heuristic(index) for index in pending] or
+                     [self._solutionCost])
+        bound = self._weight
+        if lowest > 0:
+            bound = min(bound, self._solutionCost / lowest)
+        self._bound = max(1.0, bound)
+        if self._weight <= 1.0 or self._bound <= 1.0:
+            self._bound = 1.0
+            self._done = True
+            return
+
+        #Start the next pass with every pending cell queued by its new key
+        self._weight = max(1.0, self._weight - self._weightStep)
+        for index in self._passClosed:
+            cellState[index] &= ~_CLOSED
+        self._passClosed = []
+        self._inconsistent = []
+        weight = self._weight
+        heap = []
+        for index in pending:
+            cellState[index] = (cellState[index] & ~_INCONSISTENT) | _OPEN
+            pathCost[index] = distTraveled[index] + weight * self._heuristic(index)
+            heap.append((pathCost[index], next(self._tieBreaker), index))
+        heapify(heap)
+        self._openHeap = heap
+        self._numOpen = len(heap)
+
+    def _pendingCells(self):
+        '''
+        Get the cells that are active or wait for the next pass.
+        '''
+        pending = set(index for cost, _, index in self._openHeap
+                      if self._isOpenEntry(cost, index))
+        pending.update(self._inconsistent)
+        return pending
+
+    def _traceCost(self, path):
+        '''
+        Adds up the cost of the moves of a flat array of row, column pairs.
+        '''
+        cost = 0.0
+        for pos in range(2, len(path), 2):
+            if path[pos] != path[pos - 2] and path[pos + 1] != path[pos - 1]:
+                cost += _DIAGONAL_COST
+            else:
+                cost += 1.0
+        return cost
+
+    def getPath(self):
+        '''
+        Get the best path found so far as a flat array of row, column pairs
+        like ReverseAStarAlgorithm.getPath(), or None before the first pass
+        ends.
+        '''
+        return self._solution
+
+    def getPathCost(self):
+        '''
+        Get the cost of the best path found so far, or None.
+        '''
+        return self._solutionCost
@@ -0,0 +1,146 @@
+import multiprocessing
+import queue
+import time
+from collections import deque
+from itertools import islice
+
+import model
+import solver
+import worldio
+
+#Solves many independent worlds in parallel worker processes.
+#
+#A task is a dictionary describing one world.  Generated worlds are given by
+#'rows', 'cols', 'density' and optionally 'smooth' and 'seed'.  Worlds that
+#already exist are given by 'map', the path of an ASCII map file, by 'world',
+#the path of a binary world file (see worldio.writeWorld), or by 'rows',
+#'cols' and 'grid', the row major obstacle flags as bytes (see
+#WorldModel.getObstacleGrid).  Any task may also carry 'start' and 'end' as
+#(row, col) pairs, 'writePath' to leave the path out of the result, 'stats'
+#to add the search counters to the result, 'engine' and 'heuristic' to name
+#the search engine and heuristic to use, 'timeBudget' to stop the search
+#after that many seconds and an 'id' that is copied into the result so
+#results can be matched to tasks when they arrive out of order.
+
+#Number of tasks handed to a worker at a time.  Small worlds solve in well
+#under a millisecond so sending them one by one would leave the workers
+#waiting on the pipe.
+_DEFAULT_CHUNK_SIZE = 4
+
+#Number of chunks handed out per worker before waiting for results.  Tasks
+#are only read from the iterable as results come back, so a stream of large
+#grids is never buffered whole.
+_CHUNKS_PER_WORKER = 2
+
+def buildWorld(task):
+    '''
+    Creates the world described by a batch task.
+    '''
+    if 'world' in task:
+        #Binary world files usually carry their start and end cells
+        world = worldio.readWorld(task['world'])
+        if world.getStartCell() is None or world.getEndCell() is None:
+            if 'start' not in task or 'end' not in task:
+                world.placeEndpoints()
+    elif 'map' in task or 'grid' in task:
+        if 'map' in task:
+            world = worldio.readAsciiMap(task['map'])
+        else:
+            world = model.WorldModel(task['rows'], task['cols'])
+            world.setObstacleGrid(task['grid'])
+        if 'start' not in task or 'end' not in task:
+            world.placeEndpoints()
+    else:
+        world = model.WorldModel(task['rows'], task['cols'])
+        world.reset(task['density'], task.get('smooth', 1), seed=task.get('seed'))
+
+    if 'start' in task:
+        world.setStartCell(*task['start'])
+    if 'end' in task:
+        world.setEndCell(*task['end'])
+    return world
+
+def solveTask(task):
+    '''
+    Builds and solves the world of a single batch task.  This is what the
+    worker processes run.
+    '''
+    begin = time.time()
+    world = buildWorld(task)
+    createSeconds = time.time() - begin
+
+    result = solver.solveWorld(world, collectStats=task.get('stats', False),
+                               heuristic=task.get('heuristic'),
+                               engine=task.get('engine', 'astar'),
+                               timeBudget=task.get('timeBudget'))
+    result['createSeconds'] = createSeconds
+    result['id'] = task.get('id')
+    if not task.get('writePath', True):
+        del result['path']
+    return result
+
+def _solveChunk(chunk):
+    return [solveTask(task) for task in chunk]
+
+def _iterChunks(tasks, chunkSize):
+    tasks = iter(tasks)
+    chunk = list(islice(tasks, chunkSize))
+    while chunk:
+        yield chunk
+        chunk = list(islice(tasks, chunkSize))
+
+def runBatch(tasks, workers=None, ordered=True, chunkSize=_DEFAULT_CHUNK_SIZE):
+    '''
+    Solves every task of the iterable in a pool of worker processes and
+    yields the results as they become available.  With ordered set the
+    results come back in the order of the tasks, otherwise in the order the
+    workers finish them.  workers defaults to the number of CPUs, and a
+    single worker solves the tasks in this process without starting a pool.
+    Only a few chunks of tasks per worker are read ahead of the results.
+    '''
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+
+    if workers <= 1:
+        for task in tasks:
+            yield solveTask(task)
+        return
+
+    #Ordered results are waited for in the order the chunks were handed out,
+    #unordered ones are queued by the pool's callbacks as they finish
+    pending = deque()
+    finished = queue.Queue()
+    numPending = 0
+    maxPending = workers * _CHUNKS_PER_WORKER
+
+    def nextResults():
+        if ordered:
+            return pending.popleft().get()
+        results = finished.get()
+        if isinstance(results, BaseException):
+            raise results
+        return results
+
+    pool = multiprocessing.Pool(workers)
+    try:
+        for chunk in _iterChunks(tasks, chunkSize):
+            if ordered:
+                pending.append(pool.apply_async(_solveChunk, (chunk,)))
+            else:
+                pool.apply_async(_solveChunk, (chunk,), callback=finished.put,
+                                 error_callback=finished.put)
+            numPending += 1
+            if numPending >= maxPending:
+                numPending -= 1
+                for result in nextResults():
+                    yield result
+        while numPending:
+            numPending -= 1
+            for result in nextResults():
+                yield result
+        pool.close()
+    except:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
@@ -0,0 +1,310 @@
+from array import array
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+
+import algorithm
+import heuristics
+from algorithm import _CLOSED
+from algorithm import _OPEN
+
+_INFINITY = float('inf')
+
+class _Frontier(object):
+    '''
+    One direction of a bidirectional search: an A* search from a root cell
+    toward a target cell over its own distance, cost and previous cell
+    arrays.
+    '''
+
+    def __init__(self, root, distTraveled, pathCost, cameFrom, estimate):
+        self.root = root
+        self.distTraveled = distTraveled
+        self.pathCost = pathCost
+        self.cameFrom = cameFrom
+        self.estimate = estimate
+        self.cellState = bytearray(len(cameFrom))
+        self.closedSet = []
+        self.openHeap = []
+        self.numOpen = 0
+        self.tieBreaker = count()
+
+        distTraveled[root] = 0
+        cameFrom[root] = -1
+        pathCost[root] = estimate(root)
+        self.push(root)
+
+    def push(self, index):
+        if not self.cellState[index] & _OPEN:
+            self.cellState[index] |= _OPEN
+            self.numOpen += 1
+        heappush(self.openHeap, (self.pathCost[index], next(self.tieBreaker), index))
+
+    def topCost(self):
+        '''
+        Returns the lowest estimated cost of an active cell, or None if there
+        are no active cells.  Stale heap entries are discarded.
+        '''
+        openHeap = self.openHeap
+        while openHeap:
+            cost, _, index = openHeap[0]
+            if self.cellState[index] & _OPEN and cost == self.pathCost[index]:
+                return cost
+            heappop(openHeap)
+        return None
+
+    def pop(self):
+        '''
+        Removes the active cell with the lowest estimated cost, which must
+        exist, and marks it explored.
+        '''
+        self.topCost()
+        index = heappop(self.openHeap)[2]
+        self.numOpen -= 1
+        if not self.cellState[index] & _CLOSED:
+            self.closedSet.append(index)
+        self.cellState[index] = _CLOSED
+        return index
+
+    def hasReached(self, index):
+        return self.cellState[index] != 0
+
+    def getActiveCells(self):
+        return set(index for cost, _, index in self.openHeap
+                   if self.cellState[index] & _OPEN and cost == self.pathCost[index])
+
+class BidirectionalAStar(algorithm.ReverseAStarAlgorithm):
+    '''
+    A* run from the end cell and from the start cell at the same time, each
+    step expanding the direction with fewer active cells.  Whenever a cell
+    has been reached from both directions the path through it is a
+    candidate.
+
+    Each direction estimates with the average of the heuristic toward its
+    target and the negated heuristic toward its root (Ikeda et al.), so the
+    two directions' estimates of a cell cancel out.  The search can then
+    stop as soon as the lowest keys of the two directions add up to no less
+    than the cheapest candidate, the same rule as bidirectional Dijkstra,
+    which lets the frontiers stop shortly after they meet.
+
+    The direction from the end cell uses the world model's arrays, like
+    ReverseAStarAlgorithm, and the direction from the start cell keeps its
+    own.  When the search is done the start cell's half of the path is
+    written into the model's previous cell links, so they lead from the
+    start cell to the end cell as after a plain search.  The visited and
+    active cells of both directions are reported for the GUI.
+    '''
+
+    def _reset(self):
+        model = self._worldModel
+        self._current = None
+        self._done = False
+        self._isSolvable = True
+        self._bestCost = _INFINITY
+        self._meetIndex = -1
+        self._backward = None
+        self._forward = None
+        self._currentFrontier = None
+
+        self._distTraveled = model.getDistanceTraveledArray()
+        self._pathCost = model.getEstimatedCostArray()
+        self._cameFrom = model.getPrevCellArray()
+        self._moveMasks = model.getMoveMasks()
+        self._moveTable = model.getMoveTable()
+
+        self._startCell = model.getEndCell()
+        self._endCell = model.getStartCell()
+        startIndex = model.getCellIndex(self._startCell.row, self._startCell.column)
+        self._endIndex = model.getCellIndex(self._endCell.row, self._endCell.column)
+
+        if model.isKnownUnsolvable():
+            self._isSolvable = False
+            return
+
+        #Both directions use the average of the estimates to their target and
+        #from their root, so that their two keys of any cell add up to a
+        #constant
+        heuristic = self._heuristicSource or heuristics.EuclideanHeuristic()
+        toStart = heuristic.bind(model, self._endIndex)
+        toEnd = heuristic.bind(model, startIndex)
+
+        def backwardEstimate(index):
+            return (toStart(index) - toEnd(index)) * 0.5
+
+        def forwardEstimate(index):
+            return (toEnd(index) - toStart(index)) * 0.5
+
+        numCells = model.getNumRows() * model.getNumColumns()
+        self._backward = _Frontier(startIndex, self._distTraveled, self._pathCost,
+                                   self._cameFrom, backwardEstimate)
+        self._forward = _Frontier(self._endIndex,
+                                  array('d', bytes(numCells * array('d').itemsize)),
+                                  array('d', bytes(numCells * array('d').itemsize)),
+                                  array('i', [-1]) * numCells,
+                                  forwardEstimate)
+        self._numOpen = 2
+
+    def step(self):
+        '''
+        Run a single iteration of the bidirectional search.  Will set the
+        'done' and 'solvable' flags if needed at the end of each iteration.
+        This method does nothing if algorithm has already solved the world
+        puzzle.
+        '''
+        self._meetStep(None)
+
+    def _countedStep(self, stats):
+        self._meetStep(stats)
+
+    def solve(self, maxExpansions=None, timeBudget=None):
+        '''
+        Runs the search after reset() like ReverseAStarAlgorithm.solve() by
+        repeating step().
+        '''
+        self._solveBySteps(maxExpansions, timeBudget)
+        return self.getPath(), self.getPathCost()
+
+    def _meetStep(self, stats):
+        if self._done or not self._isSolvable:
+            return
+        backward = self._backward
+        forward = self._forward
+
+        #An exhausted direction has explored every cell it can reach, so
+        #whatever candidate was found is the best one
+        backwardTop = backward.topCost()
+        forwardTop = forward.topCost()
+        if backwardTop is None or forwardTop is None:
+            if self._meetIndex == -1:
+                self._isSolvable = False
+            else:
+                self._finish()
+            return
+        if backwardTop + forwardTop >= self._bestCost:
+            self._finish()
+            return
+
+        if forward.numOpen < backward.numOpen:
+            frontier, other = forward, backward
+        else:
+            frontier, other = backward, forward
+
+        current = frontier.pop()
+        self._current = current
+        self._currentFrontier = frontier
+        if stats is not None:
+            stats.expanded += 1
+
+        distTraveled = frontier.distTraveled
+        pathCost = frontier.pathCost
+        cameFrom = frontier.cameFrom
+        cellState = frontier.cellState
+        otherDist = other.distTraveled
+        currentDist = distTraveled[current]
+        if other.hasReached(current):
+            self._offerMeeting(current, currentDist + otherDist[current])
+
+        for offset, stepCost in self._moveTable[self._moveMasks[current]]:
+            neighbor = current + offset
+            state = cellState[neighbor]
+            neighborDist = currentDist + stepCost
+
+            #Explored or active neighbors only change for a cheaper path
+            if state and neighborDist >= distTraveled[neighbor]:
+                continue
+
+            cameFrom[neighbor] = current
+            distTraveled[neighbor] = neighborDist
+            pathCost[neighbor] = neighborDist + frontier.estimate(neighbor)
+            frontier.push(neighbor)
+            if other.hasReached(neighbor):
+                self._offerMeeting(neighbor, neighborDist + otherDist[neighbor])
+            if stats is not None:
+                stats.generated += 1
+                stats.heuristicEvals += 1
+                if state & _CLOSED:
+                    stats.reopens += 1
+
+        self._numOpen = backward.numOpen + forward.numOpen
+        if stats is not None and self._numOpen > stats.peakOpen:
+            stats.peakOpen = self._numOpen
+
+    def _offerMeeting(self, index, cost):
+        if cost < self._bestCost:
+            self._bestCost = cost
+            self._meetIndex = index
+
+    def _finish(self):
+        '''
+        Marks the search done and links the start cell's half of the path
+        into the model so that its previous cell links lead from the start
+        cell through the meeting cell to the end cell.
+        '''
+        self._done = True
+        forwardFrom = self._forward.cameFrom
+        forwardDist = self._forward.distTraveled
+        cameFrom = self._cameFrom
+        distTraveled = self._distTraveled
+        index = self._meetIndex
+        while index != self._endIndex:
+            prev = forwardFrom[index]
+            cameFrom[prev] = index
+            distTraveled[prev] = self._bestCost - forwardDist[prev]
+            index = prev
+
+    def getPathCost(self):
+        if not self._done:
+            return None
+        return self._bestCost
+
+    def getCurrentPath(self):
+        '''
+        Get the cheapest known path from the current cell to the root of the
+        direction that explored it as a flat array of row, column pairs.
+        '''
+        if self._done:
+            return self.getPath()
+        if self._current is None:
+            return None
+        return self._worldModel.tracePath(self._currentFrontier.cameFrom, self._current)
+
+    def getEstimatedCost(self, cell):
+        '''
+        Get the estimated cost of a reached cell in the direction that
+        explored it, or that reached it if neither did.  The direction from
+        the start cell keeps its costs apart from the world model's.
+        '''
+        index = self._worldModel.getCellIndex(cell.row, cell.column)
+        if self._forward is None:
+            return self._pathCost[index]
+        if self._current == index and self._currentFrontier is not None:
+            frontier = self._currentFrontier
+        elif self._backward.cellState[index] & _CLOSED or not self._forward.cellState[index]:
+            frontier = self._backward
+        else:
+            frontier = self._forward
+        return frontier.pathCost[index]
+
+    def getVisitedCells(self):
+        '''
+        Get the world cells explored by either direction.
+        '''
+        if self._backward is None:
+            return []
+        getCell = self._worldModel.getCellByIndex
+        return ([getCell(index) for index in self._backward.closedSet] +
+                [getCell(index) for index in self._forward.closedSet])
+
+    def getNumVisitedCells(self):
+        if self._backward is None:
+            return 0
+        return len(self._backward.closedSet) + len(self._forward.closedSet)
+
+    def getActiveCells(self):
+        '''
+        Get the active cells of both directions.
+        '''
+        if self._backward is None:
+            return []
+        active = self._backward.getActiveCells() | self._forward.getActiveCells()
+        return [self._worldModel.getCellByIndex(index) for index in active]
@@ -0,0 +1,182 @@
+from array import array
+from heapq import heappop
+from heapq import heappush
+
+_INFINITY = float('inf')
+
+class DistanceField(object):
+    '''
+    The cost to the world's end cell from every cell, for routing many start
+    cells to one shared goal.  The field is grown by a Dijkstra search rooted
+    at the end cell, the same direction Reverse A* searches in, but without a
+    heuristic so that every finished cell holds its exact cost no matter
+    which start cell is asked about.
+
+    Nothing is expanded up front.  A query for a cell the search has not
+    finished yet resumes the search just until that cell is finished, and
+    expandAll() grows the field over the whole connected region.  Once a
+    cell is finished its path is read from the previous cell links in
+    O(path length).  The field starts over when an obstacle or the end cell
+    changes.
+
+    A (row, col) root makes a field of the costs to that cell instead of the
+    end cell.
+    '''
+
+    def __init__(self, model, root=None):
+        self._worldModel = model
+        self._root = root
+        self._dist = None
+        self._cameFrom = None
+        self._finished = None
+        self._openHeap = []
+        self._numFinished = 0
+        self._endIndex = -1
+        self._isStale = True
+        model.addObstacleListener(self._onObstacleChanged)
+
+    def detach(self):
+        '''
+        Stops listening for obstacle changes of the world model.
+        '''
+        self._worldModel.removeObstacleListener(self._onObstacleChanged)
+        self._isStale = True
+
+    def _onObstacleChanged(self, row, col):
+        self._isStale = True
+
+    def reset(self):
+        '''
+        Throws the field away and seeds a new search at the end cell.
+        '''
+        model = self._worldModel
+        numCells = model.getNumRows() * model.getNumColumns()
+        self._dist = array('d', [_INFINITY]) * numCells
+        self._cameFrom = array('i', [-1]) * numCells
+        self._finished = bytearray(numCells)
+        self._openHeap = []
+        self._numFinished = 0
+        self._isStale = False
+
+        self._moveMasks = model.getMoveMasks()
+        self._moveTable = model.getMoveTable()
+        self._numCols = model.getNumColumns()
+
+        self._endIndex = self._rootIndex()
+        if self._endIndex == -1:
+            return
+        if not model.getObstacleGrid()[self._endIndex]:
+            self._dist[self._endIndex] = 0.0
+            self._openHeap.append((0.0, self._endIndex))
+
+    def _rootIndex(self):
+        if self._root is not None:
+            return self._worldModel.getCellIndex(self._root[0], self._root[1])
+        endCell = self._worldModel.getEndCell()
+        if endCell is None:
+            return -1
+        return self._worldModel.getCellIndex(endCell.row, endCell.column)
+
+    def _checkFresh(self):
+        if self._isStale or self._rootIndex() != self._endIndex:
+            self.reset()
+
+    def expandAll(self):
+        '''
+        Finishes every cell connected to the end cell.
+        '''
+        self._checkFresh()
+        self._expand(-1)
+
+    def _expand(self, targetIndex):
+        '''
+        Continues the search until the cell at targetIndex is finished or
+        there is nothing left to expand.  Returns True if the target is
+        finished.
+        '''
+        finished = self._finished
+        if targetIndex >= 0 and finished[targetIndex]:
+            return True
+
+        openHeap = self._openHeap
+        dist = self._dist
+        cameFrom = self._cameFrom
+        moveTable = self._moveTable
+        moveMasks = self._moveMasks
+        numFinished = self._numFinished
+        try:
+            while openHeap:
+                cellDist, index = heappop(openHeap)
+                if finished[index] or cellDist != dist[index]:
+                    continue
+                finished[index] = 1
+                numFinished += 1
+
+                for offset, stepCost in moveTable[moveMasks[index]]:
+                    neighbor = index + offset
+                    neighborDist = cellDist + stepCost
+                    if neighborDist < dist[neighbor]:
+                        dist[neighbor] = neighborDist
+                        cameFrom[neighbor] = index
+                        heappush(openHeap, (neighborDist, neighbor))
+
+                if index == targetIndex:
+                    return True
+            return False
+        finally:
+            self._numFinished = numFinished
+
+    def _reach(self, index):
+        '''
+        Finishes the cell at the index if it is connected to the end cell.
+        Obstacles are turned down without searching the whole region.
+        '''
+        if self._worldModel.getObstacleGrid()[index]:
+            return False
+        return self._expand(index)
+
+    def getDistance(self, row, col):
+        '''
+        Get the cost of the cheapest path from [row,col] to the end cell, or
+        None if there is none.
+        '''
+        self._checkFresh()
+        index = self._worldModel.getCellIndex(row, col)
+        if not self._reach(index):
+            return None
+        return self._dist[index]
+
+    def getPath(self, row, col):
+        '''
+        Get the cheapest path from [row,col] to the end cell as a flat array of
+        row, column pairs like ReverseAStarAlgorithm.getPath(), or None if
+        there is none.
+        '''
+        self._checkFresh()
+        index = self._worldModel.getCellIndex(row, col)
+        if not self._reach(index):
+            return None
+        return self._worldModel.tracePath(self._cameFrom, index)
+
+    def getDistanceArray(self):
+        '''
+        Get the row major array of costs to the end cell.  Cells that are not
+        finished yet, or cannot reach the end cell, hold infinity; call
+        expandAll() first for the complete field.
+        '''
+        self._checkFresh()
+        if self._openHeap:
+            #Queued cells may still get cheaper, so only finished costs are
+            #handed out
+            return array('d', (dist if done else _INFINITY
+                               for dist, done in zip(self._dist, self._finished)))
+        return self._dist
+
+    def getNumFinishedCells(self):
+        return self._numFinished
+
+    def isComplete(self):
+        '''
+        Checks if every cell connected to the end cell is finished.
+        '''
+        return not self._isStale and not self._openHeap
@@ -317,8 +317,7 @@ class MainWindow(object):
         algorithm timer.
         '''
         if self._spdSetting == 3:
-            while not self._alg.isDone() and self._alg.isSolvable():
-                self._alg.step()
+            self._alg.solve()
                 
             self._worldWidget.repaint()
             self._timer.stop()
@@ -463,7 +462,7 @@ class WorldWidget(QWidget):
                                  #Row + 3/4 of a row so that text is in the cell
                                  (cell.row + .75) * (rowHeight + self._GRID_SIZE))
                     if self._drawCosts:
-                        painter.drawText(textLoc, "{0:.3g}".format(cell.estimatedPathCostToCell))                
+                        painter.drawText(textLoc, "{0:.3g}".format(self._alg.getEstimatedCost(cell)))                
 
     def _drawActiveCells(self, colWidth, rowHeight, painter):
         '''
@@ -481,7 +480,7 @@ class WorldWidget(QWidget):
                     textLoc = QPoint((cell.column + .1) * (colWidth + self._GRID_SIZE), 
                                  #Row + 3/4 of a row so that text is in the cell
                                  (cell.row + .75) * (rowHeight + self._GRID_SIZE))
-                    painter.drawText(textLoc, "{0:.3g}".format(cell.estimatedPathCostToCell))
+                    painter.drawText(textLoc, "{0:.3g}".format(self._alg.getEstimatedCost(cell)))
                 
     def _drawCurrentCell(self, colWidth, rowHeight, painter):
         '''
@@ -499,28 +498,23 @@ class WorldWidget(QWidget):
                 textLoc = QPoint((curCell.column + .1) * (colWidth + self._GRID_SIZE), 
                              #Row + 3/4 of a row so that text is in the cell
                              (curCell.row + .75) * (rowHeight + self._GRID_SIZE))
-                painter.drawText(textLoc, "{0:.3g}".format(curCell.estimatedPathCostToCell))
+                painter.drawText(textLoc, "{0:.3g}".format(self._alg.getEstimatedCost(curCell)))
             
     def _drawPath(self, colWidth, rowHeight, painter):
         '''
         Draws the cheapest path from the start cell to the current cell.
         '''
-        curCell = self._alg.getCurrentCell()
+        path = self._alg.getCurrentPath()
         
-        if curCell != None:
-            prevCell = curCell.prevCellInPath
-            while prevCell != None:
-                prevCenter = QPoint((prevCell.column + .5) * (colWidth + self._GRID_SIZE), 
+        if path != None:
+            for i in range(2, len(path), 2):
+                prevCenter = QPoint((path[i + 1] + .5) * (colWidth + self._GRID_SIZE), 
                              #Row + 3/4 of a row so that text is in the cell
-                             (prevCell.row + .5) * (rowHeight + self._GRID_SIZE))
-                curCenter = QPoint((curCell.column + .5) * (colWidth + self._GRID_SIZE), 
+                             (path[i] + .5) * (rowHeight + self._GRID_SIZE))
+                curCenter = QPoint((path[i - 1] + .5) * (colWidth + self._GRID_SIZE), 
                              #Row + 3/4 of a row so that text is in the cell
-                             (curCell.row + .5) * (rowHeight + self._GRID_SIZE))
+                             (path[i - 2] + .5) * (rowHeight + self._GRID_SIZE))
                 
                 #Paint line drawing a path from start to current/finish
                 painter.setPen(Qt.red)
                 painter.drawLine(prevCenter, curCenter)
-                
-                #Reset for next loop iteration
-                curCell = prevCell
-                prevCell = curCell.prevCellInPath
@@ -0,0 +1,134 @@
+import argparse
+import json
+import sys
+
+import batch
+import model
+import solver
+
+#Command line entry point for solving worlds without the GUI.  The solver and
+#batch modules hold the library functions.  Nothing here imports Qt so it
+#runs on machines without a display.
+#
+#Usage: python headless.py --rows 512 --cols 512 --density 0.3 --count 10
+#       python headless.py --map arena.map --start 10,3 --end 40,60
+#       python headless.py --count 1000 --workers 0 --unordered
+
+def generateWorld(numRows, numCols, density, smoothIterations=1, seed=None):
+    '''
+    Creates a new random world of the given size and obstacle density.
+    '''
+    world = model.WorldModel(numRows, numCols)
+    world.reset(density, smoothIterations, seed=seed)
+    return world
+
+def _parseCell(text):
+    '''
+    Parses a 'row,col' command line argument.
+    '''
+    try:
+        row, col = text.split(',')
+        return int(row), int(col)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected 'row,col', got '{0}'".format(text))
+
+def _buildArgParser():
+    parser = argparse.ArgumentParser(
+        description='Solve Reverse A* worlds without the GUI and write one '
+                    'JSON result per line.')
+    parser.add_argument('--map', action='append', default=[], dest='maps',
+                        help='ASCII map file to solve, may be repeated')
+    parser.add_argument('--world', action='append', default=[], dest='worlds',
+                        help='binary world file to solve, may be repeated')
+    parser.add_argument('--rows', type=int, default=33,
+                        help='rows of generated worlds (default 33)')
+    parser.add_argument('--cols', type=int, default=33,
+                        help='columns of generated worlds (default 33)')
+    parser.add_argument('--density', type=float, default=0.3,
+                        help='obstacle density of generated worlds (default 0.3)')
+    parser.add_argument('--smooth', type=int, default=1,
+                        help='smoothing passes of generated worlds (default 1)')
+    parser.add_argument('--count', type=int, default=1,
+                        help='number of worlds to generate when no maps are '
+                             'given (default 1)')
+    parser.add_argument('--seed', type=int,
+                        help='seed of the first generated world, the following '
+                             'worlds use the next seeds (default random)')
+    parser.add_argument('--start', type=_parseCell,
+                        help="start cell as 'row,col', picked automatically "
+                             "by default")
+    parser.add_argument('--end', type=_parseCell,
+                        help="end cell as 'row,col', picked automatically "
+                             "by default")
+    parser.add_argument('--no-path', action='store_false', dest='writePath',
+                        help='leave the path out of the results')
+    parser.add_argument('--engine', choices=sorted(solver.ENGINES), default='astar',
+                        help='search engine (default astar)')
+    parser.add_argument('--heuristic', choices=('euclidean', 'octile', 'landmark'),
+                        help='heuristic to search with (default euclidean), '
+                             'landmark is only fast for worlds saved with '
+                             'their landmark tables')
+    parser.add_argument('--time-budget', type=float, dest='timeBudget',
+                        help='seconds after which a search is stopped, the '
+                             'anytime engine returns its best path so far')
+    parser.add_argument('--stats', action='store_true',
+                        help='add the search counters and timings to the results')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU '
+                             '(default 1)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='write results as they finish instead of in order')
+    parser.add_argument('--output', default='-',
+                        help='file to write the results to (default stdout)')
+    return parser
+
+def _iterTasks(args):
+    '''
+    Yields a batch task for every world named on the command line.
+    '''
+    if args.worlds or args.maps:
+        tasks = ([{'world': path} for path in args.worlds] +
+                 [{'map': path} for path in args.maps])
+    else:
+        tasks = ({'rows': args.rows, 'cols': args.cols, 'density': args.density,
+                  'smooth': args.smooth,
+                  'seed': None if args.seed is None else args.seed + worldNum}
+                 for worldNum in range(0, args.count))
+
+    for taskNum, task in enumerate(tasks):
+        task['id'] = taskNum
+        task['writePath'] = args.writePath
+        task['stats'] = args.stats
+        task['engine'] = args.engine
+        if args.heuristic is not None:
+            task['heuristic'] = args.heuristic
+        if args.timeBudget is not None:
+            task['timeBudget'] = args.timeBudget
+        if args.start is not None:
+            task['start'] = args.start
+        if args.end is not None:
+            task['end'] = args.end
+        yield task
+
+def main(argv=None):
+    parser = _buildArgParser()
+    args = parser.parse_args(argv)
+    sources = args.worlds + args.maps or ['random']
+    output = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        results = batch.runBatch(_iterTasks(args), args.workers or None,
+                                 ordered=not args.unordered)
+        for result in results:
+            result['world'] = result.pop('id')
+            result['source'] = sources[min(result['world'], len(sources) - 1)]
+            output.write(json.dumps(result, sort_keys=True) + '\n')
+            output.flush()
+    except ValueError as e:
+        parser.error(str(e))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+from array import array
+from math import sqrt
+
+import distancefield
+
+#Heuristics estimate the cost of the cheapest path between a cell and the
+#goal of a search.  A heuristic is an object with a bind(model, goalIndex)
+#method that returns a function taking a cell index and returning the
+#estimate for that cell, so the per-cell work is a single call.  All of the
+#heuristics here never overestimate and are consistent, so searches using
+#them still find the cheapest path.
+
+#Extra cost of a diagonal move over a straight one
+_DIAGONAL_EXTRA = sqrt(2.0) - 1.0
+
+_INFINITY = float('inf')
+
+class EuclideanHeuristic(object):
+    '''
+    Straight line distance to the goal.  This is what the searches use when
+    they are not given a heuristic.
+    '''
+
+    def bind(self, model, goalIndex):
+        numCols = model.getNumColumns()
+        goalRow, goalCol = divmod(goalIndex, numCols)
+
+        def estimate(index):
+            vert, horz = divmod(index, numCols)
+            vert -= goalRow
+            horz -= goalCol
+            return sqrt(vert * vert + horz * horz)
+        return estimate
+
+class OctileHeuristic(object):
+    '''
+    Cost of the path to the goal if there were no obstacles: diagonal moves
+    for the shorter of the two distances and straight moves for the rest.
+    It is exact on open ground, tighter than the straight line distance and
+    needs no square root.
+    '''
+
+    def bind(self, model, goalIndex):
+        numCols = model.getNumColumns()
+        goalRow, goalCol = divmod(goalIndex, numCols)
+
+        def estimate(index):
+            vert, horz = divmod(index, numCols)
+            vert = abs(vert - goalRow)
+            horz = abs(horz - goalCol)
+            if vert > horz:
+                return vert + _DIAGONAL_EXTRA * horz
+            return horz + _DIAGONAL_EXTRA * vert
+        return estimate
+
+class LandmarkHeuristic(object):
+    '''
+    The ALT (A*, landmarks and triangle inequality) heuristic.  The exact
+    costs from a few landmark cells to every cell are computed once per
+    world.  By the triangle inequality the cost between a cell and the goal
+    is at least the difference of their costs to any landmark, which sees
+    around walls that the octile distance cannot, so far fewer cells are
+    expanded on maze like worlds.  The octile distance is used when it is
+    the larger bound.
+
+    Landmarks are picked spread out over the world, each one the cell
+    farthest from the ones picked before, unless they are given as a list
+    of (row, col) cells.  The tables take 8 bytes per cell per landmark.
+    They are stored with the world model (see WorldModel.setDerivedData())
+    so every landmark heuristic of the same version of the world shares
+    them, and worldio.writeWorld() can save them with the world.
+    '''
+
+    def __init__(self, model, numLandmarks=8, landmarks=None):
+        self._worldModel = model
+        self._numLandmarks = numLandmarks
+        self._landmarks = landmarks
+        self._tables = None
+        self._tablesVersion = -1
+        self._octile = OctileHeuristic()
+
+    def getLandmarks(self):
+        '''
+        Get the landmark cells as (row, col) pairs, building the tables if
+        needed.
+        '''
+        self._buildTables()
+        return [cell for cell, _ in self._tables]
+
+    def getTables(self):
+        '''
+        Get the landmark distance tables, one row major array of costs per
+        landmark in the order of getLandmarks().  Cells that cannot reach the
+        landmark hold infinity.
+        '''
+        self._buildTables()
+        return [table for _, table in self._tables]
+
+    def _buildTables(self):
+        model = self._worldModel
+        if self._tables is not None and self._tablesVersion == model.getVersion():
+            return
+        if self._landmarks is None:
+            key = ('landmarks', self._numLandmarks)
+        else:
+            key = ('landmarks', tuple(tuple(cell) for cell in self._landmarks))
+        tables = model.getDerivedData(key)
+        if tables is None:
+            tables = self._computeTables()
+            if tables:
+                model.setDerivedData(key, tables)
+        self._tables = tables
+        self._tablesVersion = model.getVersion()
+
+    def _computeTables(self):
+        '''
+        Returns a list of ((row, col), table) pairs for the landmarks.
+        '''
+        model = self._worldModel
+        if self._landmarks is not None:
+            return [((row, col), self._distancesFrom(row, col)) for row, col in self._landmarks]
+
+        #Start from the cell farthest from an open cell near the end cell
+        #then keep adding the cell whose nearest landmark is farthest away.
+        #Cells out of reach are marked -1 so that they are never picked.
+        seed = model.getEndCell() or model.getStartCell()
+        if seed is None:
+            return []
+        nearest = array('d', (dist if dist < _INFINITY else -1.0
+                              for dist in self._distancesFrom(seed.row, seed.column)))
+        numCols = model.getNumColumns()
+        tables = []
+        for _ in range(0, self._numLandmarks):
+            farthestDist = max(nearest)
+            if farthestDist <= 0.0:
+                break
+            cell = divmod(nearest.index(farthestDist), numCols)
+            table = self._distancesFrom(cell[0], cell[1])
+            tables.append((cell, table))
+            nearest = array('d', map(min, nearest, table))
+        return tables
+
+    def _distancesFrom(self, row, col):
+        field = distancefield.DistanceField(self._worldModel, (row, col))
+        field.expandAll()
+        table = field.getDistanceArray()
+        field.detach()
+        return table
+
+    def bind(self, model, goalIndex):
+        self._buildTables()
+        octile = self._octile.bind(model, goalIndex)
+
+        #Landmarks that cannot reach the goal bound nothing
+        bounds = [(table, table[goalIndex]) for _, table in self._tables
+                  if table[goalIndex] < _INFINITY]
+
+        def estimate(index):
+            best = octile(index)
+            for table, goalDist in bounds:
+                dist = table[index] - goalDist
+                if dist < 0:
+                    dist = -dist
+                if dist > best:
+                    best = dist
+            return best
+        return estimate
+
+def createHeuristic(name, model):
+    '''
+    Creates a heuristic by its name: 'euclidean', 'octile' or 'landmark'.
+    '''
+    if name == 'euclidean':
+        return EuclideanHeuristic()
+    if name == 'octile':
+        return OctileHeuristic()
+    if name == 'landmark':
+        return LandmarkHeuristic(model)
+    raise ValueError("Unknown heuristic '{0}'".format(name))
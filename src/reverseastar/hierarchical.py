@@ -0,0 +1,415 @@
+from array import array
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+
+import heuristics
+
+_INFINITY = float('inf')
+
+#Runs of open cell pairs along a cluster border shorter than this get a
+#single transition in their middle, longer ones one at each end
+_MAX_SINGLE_TRANSITION = 6
+
+#Sides of a cluster whose border it owns
+_BELOW = 0
+_RIGHT = 1
+
+class HierarchicalPathfinder(object):
+    '''
+    Hierarchical path finding (HPA*, Botea, Mueller and Schaeffer).  The
+    world is split into square clusters and every run of open cells along
+    the border of two clusters gets one or two transitions, pairs of cells
+    facing each other across the border.  The cells of the transitions are
+    the nodes of an abstract graph whose edges are the single moves across
+    the borders and the cheapest paths between the nodes of a cluster that
+    stay inside it.  A query connects its start and end cells to the nodes
+    of their clusters, searches the abstract graph and then refines every
+    edge into cells with a search that stays inside one cluster, so its cost
+    grows with the number of clusters crossed instead of the world's area.
+
+    The paths are nearly as cheap as plain A*'s but not always the
+    cheapest, as they must cross cluster borders at transitions.
+
+    The abstract graph is built on the first query.  Obstacle changes
+    reported by the world model mark the cluster of the cell dirty, along
+    with a neighboring cluster whose shared border transitions changed, and
+    the next query rebuilds only those.  A replaced world is rebuilt from
+    scratch.
+    '''
+
+    def __init__(self, model, clusterSize=16):
+        if clusterSize < 2:
+            raise ValueError('Clusters must be at least 2 cells wide')
+        self._worldModel = model
+        self._clusterSize = clusterSize
+        self._transitions = {}
+        self._links = {}
+        self._clusterEdges = {}
+        self._dirtyCells = set()
+        self._needsReset = True
+        self._numRebuilt = 0
+        self._numExpanded = 0
+        model.addObstacleListener(self._onObstacleChanged)
+
+    def detach(self):
+        '''
+        Stops listening for obstacle changes of the world model.
+        '''
+        self._worldModel.removeObstacleListener(self._onObstacleChanged)
+        self._needsReset = True
+
+    def _onObstacleChanged(self, row, col):
+        if row is None:
+            self._needsReset = True
+        elif not self._needsReset:
+            self._dirtyCells.add(row * self._numCols + col)
+
+    def reset(self):
+        '''
+        Throws the abstract graph away and builds it again for the whole
+        world.
+        '''
+        model = self._worldModel
+        size = self._clusterSize
+        self._numRows = model.getNumRows()
+        self._numCols = model.getNumColumns()
+        self._numClusterRows = (self._numRows + size - 1) // size
+        self._numClusterCols = (self._numCols + size - 1) // size
+        self._obstacles = model.getObstacleGrid()
+        self._moveMasks = model.getMoveMasks()
+        self._moveTable = model.getMoveTable()
+
+        #Cluster of every cell, for keeping searches inside a cluster
+        clusterOf = array('i')
+        for row in range(0, self._numRows):
+            first = (row // size) * self._numClusterCols
+            for clusterCol in range(0, self._numClusterCols):
+                clusterOf.extend([first + clusterCol] * min(size, self._numCols - clusterCol * size))
+        self._clusterOf = clusterOf
+        self._searchDist = array('d', [_INFINITY]) * (self._numRows * self._numCols)
+
+        self._transitions = {}
+        self._links = {}
+        self._clusterEdges = {}
+        self._dirtyCells = set()
+        self._needsReset = False
+
+        numClusters = self._numClusterRows * self._numClusterCols
+        for cluster in range(0, numClusters):
+            for side in (_BELOW, _RIGHT):
+                self._updateBorder(cluster, side)
+        for cluster in range(0, numClusters):
+            self._buildClusterEdges(cluster)
+        self._numRebuilt = numClusters
+
+    def _refresh(self):
+        '''
+        Brings the abstract graph up to date with the obstacle changes since
+        the last query.
+        '''
+        if self._needsReset:
+            self.reset()
+            return
+        self._numRebuilt = 0
+        if not self._dirtyCells:
+            return
+
+        size = self._clusterSize
+        numClusterCols = self._numClusterCols
+        dirtyClusters = set()
+        for index in self._dirtyCells:
+            row, col = divmod(index, self._numCols)
+            cluster = self._clusterOf[index]
+            dirtyClusters.add(cluster)
+
+            #Border cells also decide the transitions to the neighboring
+            #cluster, which needs rebuilding if they changed
+            borders = []
+            if row % size == size - 1 and row + 1 < self._numRows:
+                borders.append((cluster, _BELOW, cluster + numClusterCols))
+            if row % size == 0 and row > 0:
+                borders.append((cluster - numClusterCols, _BELOW, cluster - numClusterCols))
+            if col % size == size - 1 and col + 1 < self._numCols:
+                borders.append((cluster, _RIGHT, cluster + 1))
+            if col % size == 0 and col > 0:
+                borders.append((cluster - 1, _RIGHT, cluster - 1))
+            for owner, side, neighbor in borders:
+                if self._updateBorder(owner, side):
+                    dirtyClusters.add(neighbor)
+        self._dirtyCells = set()
+
+        for cluster in dirtyClusters:
+            self._buildClusterEdges(cluster)
+        self._numRebuilt = len(dirtyClusters)
+
+    def _updateBorder(self, cluster, side):
+        '''
+        Finds the transitions across the border below or right of the
+        cluster and links their cells.  Returns True if they changed.
+        '''
+        size = self._clusterSize
+        numCols = self._numCols
+        clusterRow, clusterCol = divmod(cluster, self._numClusterCols)
+        if side == _BELOW:
+            row = clusterRow * size + size - 1
+            if row + 1 >= self._numRows:
+                return False
+            first = row * numCols + clusterCol * size
+            length = min(size, numCols - clusterCol * size)
+            along = 1
+            across = numCols
+        else:
+            col = clusterCol * size + size - 1
+            if col + 1 >= numCols:
+                return False
+            first = clusterRow * size * numCols + col
+            length = min(size, self._numRows - clusterRow * size)
+            along = numCols
+            across = 1
+
+        obstacles = self._obstacles
+        transitions = []
+        runStart = -1
+        for step in range(0, length + 1):
+            cell = first + step * along
+            isOpen = step < length and not obstacles[cell] and not obstacles[cell + across]
+            if isOpen and runStart == -1:
+                runStart = step
+            elif not isOpen and runStart != -1:
+                runEnd = step - 1
+                if runEnd - runStart + 1 < _MAX_SINGLE_TRANSITION:
+                    picks = ((runStart + runEnd) // 2,)
+                else:
+                    picks = (runStart, runEnd)
+                for pick in picks:
+                    cell = first + pick * along
+                    transitions.append((cell, cell + across))
+                runStart = -1
+
+        key = (cluster, side)
+        old = self._transitions.get(key, [])
+        if transitions == old:
+            return False
+        links = self._links
+        for cell, other in old:
+            links[cell].remove(other)
+            links[other].remove(cell)
+        for cell, other in transitions:
+            links.setdefault(cell, []).append(other)
+            links.setdefault(other, []).append(cell)
+        self._transitions[key] = transitions
+        return True
+
+    def _clusterNodes(self, cluster):
+        '''
+        Get the cells of the transitions on every border of the cluster.
+        '''
+        numClusterCols = self._numClusterCols
+        clusterRow, clusterCol = divmod(cluster, numClusterCols)
+        transitions = self._transitions
+        nodes = set(cell for cell, _ in transitions.get((cluster, _BELOW), ()))
+        nodes.update(cell for cell, _ in transitions.get((cluster, _RIGHT), ()))
+        if clusterRow > 0:
+            nodes.update(other for _, other in transitions.get((cluster - numClusterCols, _BELOW), ()))
+        if clusterCol > 0:
+            nodes.update(other for _, other in transitions.get((cluster - 1, _RIGHT), ()))
+        return nodes
+
+    def _buildClusterEdges(self, cluster):
+        '''
+        Computes the cheapest paths inside the cluster between each pair of
+        its nodes.  Moves cost the same both ways, so each pair is searched
+        once.
+        '''
+        nodes = sorted(self._clusterNodes(cluster))
+        edges = dict((node, []) for node in nodes)
+        for position, node in enumerate(nodes[:-1]):
+            dist, _ = self._searchCluster(node, set(nodes[position + 1:]))
+            for other, cost in dist.items():
+                edges[node].append((other, cost))
+                edges[other].append((node, cost))
+        self._clusterEdges[cluster] = edges
+
+    def _searchCluster(self, source, targets, trace=False):
+        '''
+        Dijkstra search from the source cell that never leaves its cluster,
+        stopping once every target cell is finished.  Returns a dictionary of
+        the costs from the source to the reachable targets and, with trace, a
+        dictionary of the previous cells.
+        '''
+        cluster = self._clusterOf[source]
+        clusterOf = self._clusterOf
+        moveTable = self._moveTable
+        moveMasks = self._moveMasks
+        dist = self._searchDist
+        found = {}
+        cameFrom = {source: -1} if trace else None
+        touched = [source]
+        remaining = len(targets)
+        dist[source] = 0.0
+        openHeap = [(0.0, source)]
+        try:
+            while openHeap:
+                cellDist, index = heappop(openHeap)
+                if cellDist > dist[index]:
+                    continue
+                if index in targets:
+                    found[index] = cellDist
+                    remaining -= 1
+                    if remaining == 0:
+                        break
+
+                for offset, stepCost in moveTable[moveMasks[index]]:
+                    neighbor = index + offset
+                    neighborDist = cellDist + stepCost
+                    if neighborDist < dist[neighbor] and clusterOf[neighbor] == cluster:
+                        if dist[neighbor] == _INFINITY:
+                            touched.append(neighbor)
+                        dist[neighbor] = neighborDist
+                        if trace:
+                            cameFrom[neighbor] = index
+                        heappush(openHeap, (neighborDist, neighbor))
+        finally:
+            #The cost array is shared by every search, only the cells this
+            #one reached need clearing
+            for index in touched:
+                dist[index] = _INFINITY
+        return found, cameFrom
+
+    def solve(self):
+        '''
+        Finds a path from the world's start cell to its end cell and returns
+        (path, cost) like findPath().
+        '''
+        model = self._worldModel
+        startCell = model.getStartCell()
+        endCell = model.getEndCell()
+        if startCell is None or endCell is None:
+            return None, None
+        return self.findPath(startCell.row, startCell.column, endCell.row, endCell.column)
+
+    def findPath(self, startRow, startCol, endRow, endCol):
+        '''
+        Finds a path from [startRow,startCol] to [endRow,endCol].  Returns
+        the path as a flat array of row, column pairs like
+        ReverseAStarAlgorithm.getPath() and its cost, or (None, None) if the
+        end cannot be reached.
+        '''
+        self._refresh()
+        self._numExpanded = 0
+        model = self._worldModel
+        startIndex = model.getCellIndex(startRow, startCol)
+        endIndex = model.getCellIndex(endRow, endCol)
+        if self._obstacles[startIndex] or self._obstacles[endIndex]:
+            return None, None
+        if startIndex == endIndex:
+            return array('i', [startRow, startCol]), 0.0
+
+        nodes = self._abstractPath(startIndex, endIndex)
+        if nodes is None:
+            return None, None
+        return self._refinePath(nodes)
+
+    def _abstractPath(self, startIndex, endIndex):
+        '''
+        A* search over the abstract graph with the start and end cells
+        connected to the nodes of their clusters.  Returns the list of cells
+        of the cheapest abstract path and its cost, or None.
+        '''
+        startCluster = self._clusterOf[startIndex]
+        endCluster = self._clusterOf[endIndex]
+        startTargets = self._clusterNodes(startCluster)
+        if startCluster == endCluster:
+            startTargets.add(endIndex)
+        startTargets.discard(startIndex)
+        startEdges = list(self._searchCluster(startIndex, startTargets)[0].items())
+        endTargets = self._clusterNodes(endCluster)
+        endTargets.discard(endIndex)
+        endDist = self._searchCluster(endIndex, endTargets)[0]
+
+        estimate = heuristics.OctileHeuristic().bind(self._worldModel, endIndex)
+        clusterOf = self._clusterOf
+        clusterEdges = self._clusterEdges
+        links = self._links
+        dist = {startIndex: 0.0}
+        cameFrom = {startIndex: -1}
+        closed = set()
+        tieBreaker = count()
+        openHeap = [(estimate(startIndex), next(tieBreaker), startIndex)]
+        while openHeap:
+            _, _, index = heappop(openHeap)
+            if index in closed:
+                continue
+            closed.add(index)
+            self._numExpanded += 1
+            if index == endIndex:
+                path = []
+                while index != -1:
+                    path.append(index)
+                    index = cameFrom[index]
+                path.reverse()
+                return path, dist[endIndex]
+
+            cellDist = dist[index]
+            if index == startIndex:
+                moves = list(startEdges)
+            else:
+                moves = list(clusterEdges[clusterOf[index]].get(index, ()))
+                if clusterOf[index] == endCluster and index in endDist:
+                    moves.append((endIndex, endDist[index]))
+            moves.extend((other, 1.0) for other in links.get(index, ()))
+
+            for neighbor, stepCost in moves:
+                neighborDist = cellDist + stepCost
+                if neighbor not in closed and neighborDist < dist.get(neighbor, _INFINITY):
+                    dist[neighbor] = neighborDist
+                    cameFrom[neighbor] = index
+                    heappush(openHeap, (neighborDist + estimate(neighbor), next(tieBreaker), neighbor))
+        return None
+
+    def _refinePath(self, abstractPath):
+        '''
+        Turns the cells of an abstract path into a path of neighboring cells
+        by searching between consecutive cells of the same cluster.
+        '''
+        nodes, cost = abstractPath
+        numCols = self._numCols
+        clusterOf = self._clusterOf
+        path = array('i', divmod(nodes[0], numCols))
+        for prev, index in zip(nodes, nodes[1:]):
+            if clusterOf[prev] == clusterOf[index]:
+                _, cameFrom = self._searchCluster(prev, (index,), True)
+                segment = []
+                cell = index
+                while cell != prev:
+                    segment.append(cell)
+                    cell = cameFrom[cell]
+                for cell in reversed(segment):
+                    path.extend(divmod(cell, numCols))
+            else:
+                path.extend(divmod(index, numCols))
+        return path, cost
+
+    def getNumClusters(self):
+        if self._needsReset:
+            return 0
+        return self._numClusterRows * self._numClusterCols
+
+    def getNumNodes(self):
+        '''
+        Get the number of cells in the abstract graph.
+        '''
+        return sum(len(edges) for edges in self._clusterEdges.values())
+
+    def getNumRebuiltClusters(self):
+        '''
+        Get the number of clusters whose paths the last query recomputed.
+        '''
+        return self._numRebuilt
+
+    def getNumVisitedCells(self):
+        '''
+        Get the number of abstract graph nodes expanded by the last query.
+        '''
+        return self._numExpanded
@@ -0,0 +1,322 @@
+from array import array
+from heapq import heappop
+from heapq import heappush
+from itertools import count
+from math import sqrt
+
+#Per-cell search state flag of cells that are queued for expansion
+_OPEN = 1
+
+_INFINITY = float('inf')
+
+#Relative slack when comparing a queued key with the start cell's key.  A
+#cell whose key ties the start cell's can lie on the shortest path, but
+#adding up different step costs rounds differently so an exact tie may come
+#out a hair too high.  Such cells are expanded as well.
+_KEY_TOLERANCE = 1e-9
+
+class IncrementalReverseAStar(object):
+    '''
+    Reverse A* that keeps its search tree between solves and repairs it when
+    obstacles change, following D* Lite (Koenig and Likhachev).  Like
+    ReverseAStarAlgorithm the tree is rooted at the world's end cell, so every
+    cell's distance to the end cell (g) stays valid until an obstacle near it
+    changes.  Obstacle changes reported by the world model only requeue the
+    cells around them and the next solve() re-expands just the part of the
+    tree whose distances changed.  The start cell may also move between
+    solves without throwing the tree away.
+
+    The g and rhs (one step lookahead of g) values are kept in flat arrays in
+    the world model's row major order.  The open set is a heap with lazily
+    invalidated entries, as in ReverseAStarAlgorithm.
+    '''
+
+    def __init__(self, model):
+        self._worldModel = model
+        self._g = None
+        self._rhs = None
+        self._queuedTie = None
+        self._cellState = bytearray()
+        self._openHeap = []
+        self._tieBreaker = count()
+        self._keyModifier = 0.0
+        self._startIndex = -1
+        self._endIndex = -1
+        self._changedCells = set()
+        self._needsReset = True
+        self._numExpanded = 0
+        self._listening = False
+
+    def reset(self):
+        '''
+        Throws away the search tree and starts listening for obstacle changes
+        of the world model.  solve() resets automatically the first time and
+        whenever the whole world or its end cell is replaced.
+        '''
+        model = self._worldModel
+        if not self._listening:
+            model.addObstacleListener(self._onObstacleChanged)
+            self._listening = True
+
+        numCells = model.getNumRows() * model.getNumColumns()
+        self._g = array('d', [_INFINITY]) * numCells
+        self._rhs = array('d', [_INFINITY]) * numCells
+        self._queuedTie = array('q', bytes(numCells * array('q').itemsize))
+        self._cellState = bytearray(numCells)
+        self._openHeap = []
+        self._tieBreaker = count()
+        self._keyModifier = 0.0
+        self._changedCells = set()
+        self._needsReset = False
+        self._numExpanded = 0
+
+        self._obstacles = model.getObstacleGrid()
+        self._moveMasks = model.getMoveMasks()
+        self._moveTable = model.getMoveTable()
+        self._numCols = model.getNumColumns()
+
+        startCell = model.getStartCell()
+        endCell = model.getEndCell()
+        if startCell is None or endCell is None:
+            self._startIndex = self._endIndex = -1
+            return
+        self._startIndex = model.getCellIndex(startCell.row, startCell.column)
+        self._endIndex = model.getCellIndex(endCell.row, endCell.column)
+
+        if not self._obstacles[self._endIndex]:
+            self._rhs[self._endIndex] = 0.0
+            self._updateCell(self._endIndex)
+
+    def detach(self):
+        '''
+        Stops listening for obstacle changes of the world model.
+        '''
+        if self._listening:
+            self._worldModel.removeObstacleListener(self._onObstacleChanged)
+            self._listening = False
+        self._needsReset = True
+
+    def _onObstacleChanged(self, row, col):
+        if row is None:
+            self._needsReset = True
+        else:
+            self._changedCells.add(row * self._numCols + col)
+
+    def solve(self):
+        '''
+        Brings the search tree up to date with the world and returns
+        (getPath(), getPathCost()), which are (None, None) if the end cell
+        cannot be reached from the start cell.
+        '''
+        model = self._worldModel
+        startCell = model.getStartCell()
+        endCell = model.getEndCell()
+        if (self._needsReset or startCell is None or endCell is None or
+                model.getCellIndex(endCell.row, endCell.column) != self._endIndex):
+            self.reset()
+            if self._startIndex == -1:
+                return None, None
+
+        #A moved start cell changes every heuristic value.  Instead of
+        #requeuing everything the keys computed from now on are raised by the
+        #distance moved, which keeps them comparable to the queued ones.
+        startIndex = model.getCellIndex(startCell.row, startCell.column)
+        if startIndex != self._startIndex:
+            self._keyModifier += self._heuristic(self._startIndex, startIndex)
+            self._startIndex = startIndex
+
+        self._repairChangedCells()
+        self._numExpanded = 0
+        self._computeShortestPath()
+        return self.getPath(), self.getPathCost()
+
+    def _repairChangedCells(self):
+        '''
+        Recomputes the rhs values of the cells whose moves may have changed.
+        An obstacle change only affects the moves out of the cells in the 3x3
+        block around it, including diagonal moves that used it as a corner.
+        The end cell's rhs is 0 while it is open and infinite while it is an
+        obstacle.
+        '''
+        if not self._changedCells:
+            return
+        numCols = self._numCols
+        numRows = len(self._obstacles) // numCols
+        affected = set()
+        for index in self._changedCells:
+            row, col = divmod(index, numCols)
+            for nRow in range(max(0, row - 1), min(numRows, row + 2)):
+                for nCol in range(max(0, col - 1), min(numCols, col + 2)):
+                    affected.add(nRow * numCols + nCol)
+        self._changedCells = set()
+
+        for index in affected:
+            if index != self._endIndex:
+                self._rhs[index] = self._lookahead(index)
+            else:
+                self._rhs[index] = _INFINITY if self._obstacles[index] else 0.0
+            self._updateCell(index)
+
+    def _computeShortestPath(self):
+        '''
+        Expands inconsistent cells until the start cell is consistent and no
+        queued cell could still lower its distance.
+        '''
+        g = self._g
+        rhs = self._rhs
+        cellState = self._cellState
+        moveTable = self._moveTable
+        moveMasks = self._moveMasks
+        startIndex = self._startIndex
+        endIndex = self._endIndex
+
+        while True:
+            entry = self._peekOpen()
+            if entry is None:
+                break
+            key1, key2, _, index = entry
+            startKey = self._calculateKey(startIndex)[0]
+            if (key1 > startKey + _KEY_TOLERANCE * startKey and
+                    rhs[startIndex] == g[startIndex]):
+                break
+
+            newKey = self._calculateKey(index)
+            if (key1, key2) < newKey:
+                #Queued before the start cell moved
+                self._pushOpen(index, newKey)
+                continue
+
+            heappop(self._openHeap)
+            cellState[index] &= ~_OPEN
+            self._numExpanded += 1
+            moves = moveTable[moveMasks[index]]
+            if g[index] > rhs[index]:
+                #The cell got cheaper, which can only make its neighbors cheaper
+                cellDist = g[index] = rhs[index]
+                for offset, stepCost in moves:
+                    neighbor = index + offset
+                    if neighbor != endIndex and cellDist + stepCost < rhs[neighbor]:
+                        rhs[neighbor] = cellDist + stepCost
+                        self._updateCell(neighbor)
+            else:
+                #The cell got more expensive, so every neighbor that went
+                #through it needs a new best move
+                oldDist = g[index]
+                g[index] = _INFINITY
+                for offset, stepCost in moves:
+                    neighbor = index + offset
+                    if neighbor != endIndex and rhs[neighbor] == oldDist + stepCost:
+                        rhs[neighbor] = self._lookahead(neighbor)
+                        self._updateCell(neighbor)
+                if index != endIndex:
+                    rhs[index] = self._lookahead(index)
+                self._updateCell(index)
+
+    def _lookahead(self, index):
+        '''
+        Computes the rhs value of a cell: its cheapest move plus the distance
+        from that neighbor to the end cell.
+        '''
+        if self._obstacles[index]:
+            return _INFINITY
+        g = self._g
+        best = _INFINITY
+        for offset, stepCost in self._moveTable[self._moveMasks[index]]:
+            dist = g[index + offset] + stepCost
+            if dist < best:
+                best = dist
+        return best
+
+    def _updateCell(self, index):
+        '''
+        Queues the cell if its g and rhs values disagree and drops it from the
+        queue otherwise.
+        '''
+        if self._g[index] != self._rhs[index]:
+            self._pushOpen(index, self._calculateKey(index))
+        else:
+            self._cellState[index] &= ~_OPEN
+
+    def _pushOpen(self, index, key):
+        '''
+        Queues the cell with the key.  Only the heap entry pushed last for a
+        cell is valid, it is recognized by its tie breaker.
+        '''
+        tie = next(self._tieBreaker)
+        self._cellState[index] |= _OPEN
+        self._queuedTie[index] = tie
+        heappush(self._openHeap, (key[0], key[1], tie, index))
+
+    def _peekOpen(self):
+        '''
+        Returns the lowest valid heap entry without removing it.  Entries of
+        cells that left the queue or were queued again with another key are
+        discarded along the way.
+        '''
+        openHeap = self._openHeap
+        while openHeap:
+            entry = openHeap[0]
+            index = entry[3]
+            if self._cellState[index] & _OPEN and entry[2] == self._queuedTie[index]:
+                return entry
+            heappop(openHeap)
+        return None
+
+    def _calculateKey(self, index):
+        dist = min(self._g[index], self._rhs[index])
+        return (dist + self._heuristic(self._startIndex, index) + self._keyModifier, dist)
+
+    def _heuristic(self, fromIndex, toIndex):
+        '''
+        Straight line distance between two cells.
+        '''
+        fromRow, fromCol = divmod(fromIndex, self._numCols)
+        toRow, toCol = divmod(toIndex, self._numCols)
+        vert = fromRow - toRow
+        horz = fromCol - toCol
+        return sqrt(vert * vert + horz * horz)
+
+    def getPath(self):
+        '''
+        Get the path from the start cell to the end cell as a flat array of
+        row, column pairs like ReverseAStarAlgorithm.getPath(), or None if
+        there is no path.  Every step moves to the neighbor with the cheapest
+        distance to the end cell.
+        '''
+        if self._startIndex == -1 or self._g[self._startIndex] == _INFINITY:
+            return None
+        g = self._g
+        moveTable = self._moveTable
+        moveMasks = self._moveMasks
+        indices = []
+        index = self._startIndex
+        while True:
+            indices.append(index)
+            if index == self._endIndex:
+                return self._worldModel.packPath(indices)
+            best = _INFINITY
+            nextIndex = -1
+            for offset, stepCost in moveTable[moveMasks[index]]:
+                dist = g[index + offset] + stepCost
+                if dist < best:
+                    best = dist
+                    nextIndex = index + offset
+            index = nextIndex
+
+    def getPathCost(self):
+        '''
+        Get the cost of the path from the start cell to the end cell, or None
+        if there is no path.
+        '''
+        if self._startIndex == -1 or self._g[self._startIndex] == _INFINITY:
+            return None
+        return self._g[self._startIndex]
+
+    def getNumVisitedCells(self):
+        '''
+        Get the number of cells expanded by the last solve().
+        '''
+        return self._numExpanded
+
+    def isSolvable(self):
+        return self.getPathCost() is not None
@@ -0,0 +1,297 @@
+from array import array
+
+import algorithm
+from algorithm import _CLOSED
+from algorithm import _OPEN
+from model import _DIAGONAL_COST
+from model import _MOVE_DIRECTIONS
+
+class JumpPointSearch(algorithm.ReverseAStarAlgorithm):
+    '''
+    Jump Point Search (Harabor and Grastien) over the same uniform cost,
+    8-connected worlds as ReverseAStarAlgorithm, searching from the end cell
+    back to the start cell.  Instead of queueing every neighbor, each
+    expansion jumps along straight and diagonal lines and only queues the
+    cells where a cheaper path could turn (jump points), which skips the
+    many equally cheap paths across open ground.
+
+    The pruning rules follow the world's corner rule, where a diagonal move
+    needs at least one of the two cells it passes between to be open.  Paths
+    cost the same as plain A*.
+
+    Only jump points are visited and queued, so getVisitedCells() and
+    getActiveCells() show the jump points.  The previous cell links of jump
+    points lead to the previous jump point, and once the search is done the
+    cells in between are filled in so the model's path links lead from cell
+    to cell as usual.
+    '''
+
+    def _reset(self):
+        algorithm.ReverseAStarAlgorithm._reset(self)
+
+        #Obstacles are looked up in a copy of the grid padded with a border of
+        #obstacles, so the jumps need no bounds checks.  Padded indices have a
+        #row stride of numCols + 2.
+        model = self._worldModel
+        numCols = model.getNumColumns()
+        stride = numCols + 2
+        openCells = bytearray(stride * (model.getNumRows() + 2))
+        openTable = bytes(bytearray(1 if value == 0 else 0 for value in range(256)))
+        obstacles = model.getObstacleGrid()
+        for row in range(0, model.getNumRows()):
+            padded = (row + 1) * stride + 1
+            openCells[padded:padded + numCols] = obstacles[row * numCols:(row + 1) * numCols].translate(openTable)
+        self._openCells = openCells
+        self._stride = stride
+        self._numCols = numCols
+        self._paddedEnd = self._pad(self._endIndex)
+
+    def _pad(self, index):
+        row, col = divmod(index, self._numCols)
+        return (row + 1) * self._stride + col + 1
+
+    def _unpad(self, padded):
+        row, col = divmod(padded, self._stride)
+        return (row - 1) * self._numCols + col - 1
+
+    def step(self):
+        '''
+        Run a single iteration of Jump Point Search.  Will set the 'done' and
+        'solvable' flags if needed at the end of each iteration.  This method
+        does nothing if algorithm has already solved the world puzzle.
+        '''
+        self._jumpStep(None)
+
+    def _countedStep(self, stats):
+        self._jumpStep(stats)
+
+    def solve(self, maxExpansions=None, timeBudget=None):
+        '''
+        Runs the search after reset() like ReverseAStarAlgorithm.solve().
+        Jumping dominates the cost of an expansion, so this simply repeats
+        step().
+        '''
+        self._solveBySteps(maxExpansions, timeBudget)
+        return self.getPath(), self.getPathCost()
+
+    def _jumpStep(self, stats):
+        if self._numOpen > 0 and not self._done:
+            cellState = self._cellState
+            distTraveled = self._distTraveled
+            pathCost = self._pathCost
+            cameFrom = self._cameFrom
+            numCols = self._numCols
+
+            current = self._popLowestEstimatedCost()
+            self._current = current
+            if not cellState[current] & _CLOSED:
+                self._closedSet.append(current)
+            cellState[current] = _CLOSED
+            if stats is not None:
+                stats.expanded += 1
+
+            #Bail out of the algorithm if we find the goal
+            if current == self._endIndex:
+                self._done = True
+                self._fillPathGaps()
+                return
+
+            row, col = divmod(current, numCols)
+            paddedCurrent = self._pad(current)
+            for rowStep, colStep in self._prunedDirections(current, paddedCurrent):
+                jumpPoint = self._jump(paddedCurrent, rowStep, colStep)
+                if jumpPoint == -1:
+                    continue
+                neighbor = self._unpad(jumpPoint)
+                state = cellState[neighbor]
+
+                #Jump points lie on a straight or diagonal line from the cell
+                nRow, nCol = divmod(neighbor, numCols)
+                steps = max(abs(nRow - row), abs(nCol - col))
+                currentDist = distTraveled[current] + steps * (_DIAGONAL_COST if rowStep and colStep else 1.0)
+
+                if state & _CLOSED and currentDist >= distTraveled[neighbor]:
+                    continue
+
+                if not state & _OPEN or currentDist < distTraveled[neighbor]:
+                    cameFrom[neighbor] = current
+                    distTraveled[neighbor] = currentDist
+                    pathCost[neighbor] = currentDist + self._heuristic(neighbor)
+                    self._addToOpenSet(neighbor)
+                    if stats is not None:
+                        stats.generated += 1
+                        stats.heuristicEvals += 1
+                        if state & _CLOSED:
+                            stats.reopens += 1
+
+            if stats is not None and self._numOpen > stats.peakOpen:
+                stats.peakOpen = self._numOpen
+        elif self._numOpen == 0 and not self._done:
+            #If we're not done and we have no more active cells then the
+            #world puzzle isn't solvable.
+            self._isSolvable = False
+
+    def _prunedDirections(self, index, padded):
+        '''
+        Returns the directions worth jumping in from the cell.  Coming from a
+        parent only the natural moves (continuing the same way) and the forced
+        moves (around an obstacle next to the cell) can start a cheaper path,
+        every other neighbor is reached at least as cheaply through the
+        parent.
+        '''
+        openCells = self._openCells
+        stride = self._stride
+        parent = self._cameFrom[index]
+        if parent == -1:
+            #The root of the search moves everywhere the corner rule allows
+            return [(rowStep, colStep) for rowStep, colStep in _MOVE_DIRECTIONS
+                    if openCells[padded + rowStep * stride + colStep] and
+                    (not (rowStep and colStep) or openCells[padded + rowStep * stride] or
+                     openCells[padded + colStep])]
+
+        row, col = divmod(index, self._numCols)
+        parentRow, parentCol = divmod(parent, self._numCols)
+        rowStep = (row > parentRow) - (row < parentRow)
+        colStep = (col > parentCol) - (col < parentCol)
+        rowOpen = openCells[padded + rowStep * stride]
+        colOpen = openCells[padded + colStep]
+
+        directions = []
+        if rowStep and colStep:
+            if rowOpen:
+                directions.append((rowStep, 0))
+            if colOpen:
+                directions.append((0, colStep))
+            if rowOpen or colOpen:
+                directions.append((rowStep, colStep))
+            if not openCells[padded - colStep] and rowOpen:
+                directions.append((rowStep, -colStep))
+            if not openCells[padded - rowStep * stride] and colOpen:
+                directions.append((-rowStep, colStep))
+        elif rowStep:
+            if rowOpen:
+                directions.append((rowStep, 0))
+                if not openCells[padded + 1]:
+                    directions.append((rowStep, 1))
+                if not openCells[padded - 1]:
+                    directions.append((rowStep, -1))
+        else:
+            if colOpen:
+                directions.append((0, colStep))
+                if not openCells[padded + stride]:
+                    directions.append((1, colStep))
+                if not openCells[padded - stride]:
+                    directions.append((-1, colStep))
+        return directions
+
+    def _jump(self, padded, rowStep, colStep):
+        '''
+        Moves from the padded cell index in the given direction until it
+        reaches a jump point, returning its padded index, or -1 if the way is
+        blocked first.  A diagonal move only takes a single diagonal step at
+        a time and looks for jump points along the two straight directions
+        it is made of.
+        '''
+        if not (rowStep and colStep):
+            return self._jumpStraight(padded + rowStep * self._stride + colStep, rowStep, colStep)
+
+        openCells = self._openCells
+        goal = self._paddedEnd
+        vert = rowStep * self._stride
+        horz = colStep
+        while True:
+            padded += vert + horz
+            if not openCells[padded]:
+                return -1
+            if padded == goal:
+                return padded
+
+            #A cell is a jump point if a neighbor behind it can only be
+            #reached cheaply through it
+            if ((openCells[padded - horz + vert] and not openCells[padded - horz]) or
+                    (openCells[padded + horz - vert] and not openCells[padded - vert])):
+                return padded
+            if (self._jumpStraight(padded + horz, 0, colStep) != -1 or
+                    self._jumpStraight(padded + vert, rowStep, 0) != -1):
+                return padded
+
+            #The next diagonal step needs one of the cells it passes open
+            if not (openCells[padded + horz] or openCells[padded + vert]):
+                return -1
+
+    def _jumpStraight(self, padded, rowStep, colStep):
+        '''
+        Jumps along a row or column starting at the padded cell index.
+        Returns the padded index of the jump point or -1.
+        '''
+        openCells = self._openCells
+        goal = self._paddedEnd
+        stride = self._stride
+        if rowStep:
+            move = rowStep * stride
+            side = 1
+        else:
+            move = colStep
+            side = stride
+
+        while openCells[padded]:
+            if padded == goal:
+                return padded
+            #An obstacle beside the cell that ends just ahead forces a turn
+            if ((openCells[padded + move + side] and not openCells[padded + side]) or
+                    (openCells[padded + move - side] and not openCells[padded - side])):
+                return padded
+            padded += move
+        return -1
+
+    def _fillPathGaps(self):
+        '''
+        Links the cells between consecutive jump points of the found path so
+        that the model's previous cell links lead along every cell of it.
+        '''
+        numCols = self._numCols
+        cameFrom = self._cameFrom
+        distTraveled = self._distTraveled
+        index = self._endIndex
+        while cameFrom[index] != -1:
+            parent = cameFrom[index]
+            row, col = divmod(index, numCols)
+            parentRow, parentCol = divmod(parent, numCols)
+            rowStep = (parentRow > row) - (parentRow < row)
+            colStep = (parentCol > col) - (parentCol < col)
+            stepCost = _DIAGONAL_COST if rowStep and colStep else 1.0
+            offset = rowStep * numCols + colStep
+            while index + offset != parent:
+                cameFrom[index] = index + offset
+                distTraveled[index + offset] = distTraveled[index] - stepCost
+                index += offset
+            cameFrom[index] = parent
+            index = parent
+
+    def _tracePath(self, index):
+        '''
+        Like ReverseAStarAlgorithm._tracePath() but also lists the cells
+        between consecutive jump points.
+        '''
+        numCols = self._numCols
+        cameFrom = self._cameFrom
+        path = array('i')
+        append = path.append
+        while index != -1:
+            parent = cameFrom[index]
+            row, col = divmod(index, numCols)
+            append(row)
+            append(col)
+            if parent != -1:
+                parentRow, parentCol = divmod(parent, numCols)
+                rowStep = (parentRow > row) - (parentRow < row)
+                colStep = (parentCol > col) - (parentCol < col)
+                row += rowStep
+                col += colStep
+                while row != parentRow or col != parentCol:
+                    append(row)
+                    append(col)
+                    row += rowStep
+                    col += colStep
+            index = parent
+        return path
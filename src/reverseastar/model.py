@@ -1,230 +1,839 @@
 import random
-import copy
+from array import array
+from heapq import heappop
+from heapq import heappush
+from math import sqrt
+
+#Cost of moving between two diagonally adjacent cells
+_DIAGONAL_COST = sqrt(2.0)
+
+#Moves to the neighbors of a cell as (row step, column step), straight moves
+#first.  Bit n of a move mask stands for the nth move.
+_MOVE_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1),
+                    (-1, -1), (-1, 1), (1, -1), (1, 1))
+
+#Maps any byte to an obstacle flag
+_FLAG_TABLE = bytes(bytearray(1 if value else 0 for value in range(256)))
+
+#Maps (obstacle neighbor count * 2 + obstacle flag) of a cell to its obstacle
+#flag after clumping.  Crowded cells become obstacles and lonely cells clear.
+_CLUMP_TABLE = bytes(bytearray(1 if value >> 1 > 3 else
+                               0 if value >> 1 < 2 else
+                               value & 1
+                               for value in range(256)))
 
 class WorldCell(object):
     '''
-    Simple structure to hold the row and column coordinates
-    of a world grid cell.
+    Lightweight view of a single world grid cell.  The state of the cell is
+    stored in the arrays of the WorldModel that owns it, so views are cheap
+    to create on demand and any number of them may refer to the same cell.
+    The coordinates are plain slot attributes.
     '''
-    
-    def __init__(self):
-        self._row = -1
-        self._col = -1
-        self._isObstacle = False
-        self._distTraveled = 0.0
-        self._pathCost = 0.0
-        self._cameFrom = None
-        
-    @property
-    def row(self):
-        return self._row
-    
-    @row.setter
-    def row(self, value):
-        self._row = value
-        
-    @property
-    def column(self):
-        return self._col
-    
-    @column.setter
-    def column(self, value):
-        self._col = value
-    
+
+    __slots__ = ('_model', '_index', 'row', 'column')
+
+    def __init__(self, model, row, col):
+        self._model = model
+        self._index = row * model.getNumColumns() + col
+        self.row = row
+        self.column = col
+
     #@property
     def isObstacle(self):
-        return self._isObstacle
-    
+        return self._model._obstacles[self._index] != 0
+
     #@isObstacle.setter
     def setObstacle(self, value):
-        self._isObstacle = value
-        
+        self._model.setObstacle(self.row, self.column, value)
+
     @property
     def distanceTraveledToCell(self):
-        return self._distTraveled
-    
+        return self._model.getDistanceTraveledArray()[self._index]
+
     @distanceTraveledToCell.setter
     def distanceTraveledToCell(self, value):
-        self._distTraveled = value
-        
+        self._model.getDistanceTraveledArray()[self._index] = value
+
     @property
     def estimatedPathCostToCell(self):
-        return self._pathCost
-    
+        return self._model.getEstimatedCostArray()[self._index]
+
     @estimatedPathCostToCell.setter
     def estimatedPathCostToCell(self, value):
-        self._pathCost = value
-    
+        self._model.getEstimatedCostArray()[self._index] = value
+
     @property
     def prevCellInPath(self):
-        return self._cameFrom
-    
+        prevIndex = self._model.getPrevCellArray()[self._index]
+        if prevIndex < 0:
+            return None
+        return self._model.getCellByIndex(prevIndex)
+
     @prevCellInPath.setter
     def prevCellInPath(self, value):
-        self._cameFrom = value
-    
+        if value is None:
+            self._model.getPrevCellArray()[self._index] = -1
+        else:
+            self._model.getPrevCellArray()[self._index] = value._index
+
     def __eq__(self, other):
         return (isinstance(other, self.__class__)
-                and self._col == other._col
-                and self._row == other._row)
-    
+                and self._model is other._model
+                and self._index == other._index)
+
     def __ne__(self, other):
         return not self.__eq__(other)
-    
+
+    def __hash__(self):
+        return self._index
+
     def __str__(self):
-        return '{0},{1},{2}'.format(self._row, self._col, self._isObstacle)
+        return '{0},{1},{2}'.format(self.row, self.column, self.isObstacle())
 
 class WorldModel(object):
-    
-    def __init__(self):
-        self._NUM_COLS = 33
-        self._NUM_ROWS = 33
-        self._data = {}
+    '''
+    A 2D grid world stored as flat, row major arrays.  Obstacles are kept in
+    a bytearray with one byte per cell and the path finding state of every
+    cell (distance traveled, estimated path cost and the index of the
+    previous cell in the path) lives in parallel arrays that are allocated
+    the first time they are needed.  WorldCell views are only created when a
+    cell is requested.
+    '''
+
+    def __init__(self, numRows=33, numCols=33):
+        self._NUM_COLS = numCols
+        self._NUM_ROWS = numRows
+        self._obstacles = bytearray()
+        self._distTraveled = None
+        self._pathCost = None
+        self._cameFrom = None
         self._startCell = None
         self._endCell = None
-        self._resetWorldData()        
-        
+        self._componentLabels = None
+        self._labelParents = None
+        self._labelsDropped = False
+        self._endpointConnection = None
+        self._moveMasks = None
+        self._moveTable = self._buildMoveTable()
+        self._generationParams = None
+        self._obstacleListeners = []
+        self._version = 0
+        self._derivedData = {}
+        self._resetWorldData()
+
     def getNumRows(self):
         return self._NUM_ROWS
-    
+
     def getNumColumns(self):
         return self._NUM_COLS
-    
+
     def getStartCell(self):
         '''
         Get the starting point of the world for path finding.
         '''
         return self._startCell
-    
+
     def getEndCell(self):
         '''
         Get the end point of the world for path finding.
         '''
         return self._endCell
-    
+
     def _resetWorldData(self):
-        self._data.clear()
         self._startCell = None
         self._endCell = None
-        
-        for row in range(0, self._NUM_ROWS):
-            self._data[row] = {}
-            for col in range(0, self._NUM_COLS):
-                cell = WorldCell()
-                cell.row = row
-                cell.column = col
-                self._data[row][col] = cell
-                
-    def reset(self, density):
+        self._componentLabels = None
+        self._labelParents = None
+        self._labelsDropped = False
+        self._endpointConnection = None
+        self._moveMasks = None
+        self._generationParams = None
+
+        self._obstacles = bytearray(self._NUM_ROWS * self._NUM_COLS)
+        self._distTraveled = None
+        self._pathCost = None
+        self._cameFrom = None
+
+    def _allocateSearchArrays(self):
+        numCells = self._NUM_ROWS * self._NUM_COLS
+        self._distTraveled = array('d', bytes(numCells * array('d').itemsize))
+        self._pathCost = array('d', bytes(numCells * array('d').itemsize))
+        self._cameFrom = array('i', [-1]) * numCells
+
+    def reset(self, density, smoothIterations=1, maxAttempts=10, seed=None):
         '''
         Create a new random 2D world with the given density of obstacles as the
         random seed for obstacle generation.  After the random generation this
         method will attempt to smooth out and cluster the obstacles and free
-        paths.
+        paths, repeating the smoothing pass smoothIterations times.  The
+        density is applied in steps of 1/256.
+
+        The start and end cells are always open and connected.  Up to
+        maxAttempts worlds are generated looking for a connected pair, after
+        that a corridor is cleared between the start and end cells of the last
+        world.
+
+        seed is either an integer or a random.Random instance to draw the
+        obstacles from.  The same integer seed always generates the same
+        world.  Without a seed the shared generator of the random module is
+        used.
+        '''
+        if seed is None:
+            rng = random
+        elif isinstance(seed, random.Random):
+            rng = seed
+        else:
+            rng = random.Random(seed)
+
+        for _ in range(0, max(1, maxAttempts)):
+            self._generateObstacles(density, smoothIterations, rng)
+            start, end = self._placeEndpoints()
+            if end != (-1, -1):
+                break
+        else:
+            if start == (-1, -1):
+                start = (self._NUM_ROWS - 1, 0)
+            end = (0, self._NUM_COLS - 1)
+            self._clearCorridor(start, end)
+
+        self._startCell = self.getCell(start[0], start[1])
+        self._endCell = self.getCell(end[0], end[1])
+        self._recordConnection(True)
+        self._generationParams = {'density': density,
+                                  'smoothIterations': smoothIterations,
+                                  'maxAttempts': maxAttempts,
+                                  'seed': (seed if isinstance(seed, int) and
+                                           not isinstance(seed, bool) else None)}
+        self._bumpVersion()
+        self._notifyObstacleListeners(None, None)
+
+    def getGenerationParams(self):
+        '''
+        Get the parameters reset() generated the current world with as a
+        dictionary of density, smoothIterations, maxAttempts and seed.  The
+        seed is None unless an integer seed was given.  Returns None if the
+        world was not generated by reset().
+        '''
+        if self._generationParams is None:
+            return None
+        return dict(self._generationParams)
+
+    def setGenerationParams(self, params):
+        '''
+        Records the parameters the current world was generated with, in the
+        form getGenerationParams() returns them, for example for a world
+        loaded from a file.
+        '''
+        self._generationParams = None if params is None else dict(params)
+
+    def placeEndpoints(self):
+        '''
+        Picks connected start and end cells among the current obstacles, the
+        same way reset() does for generated worlds.  Returns False and leaves
+        the start and end cells unset if no connected pair was found.
+        '''
+        start, end = self._placeEndpoints()
+        if end == (-1, -1):
+            self._startCell = None
+            self._endCell = None
+            return False
+        self._startCell = self.getCell(start[0], start[1])
+        self._endCell = self.getCell(end[0], end[1])
+        self._recordConnection(True)
+        return True
+
+    def setStartCell(self, row, col):
+        '''
+        Set the starting point of the world for path finding.
+        '''
+        if not self._isValidCoordinate(row, col):
+            raise ValueError('{0},{1} is outside of the world'.format(row, col))
+        self._startCell = self.getCell(row, col)
+
+    def setEndCell(self, row, col):
+        '''
+        Set the end point of the world for path finding.
         '''
+        if not self._isValidCoordinate(row, col):
+            raise ValueError('{0},{1} is outside of the world'.format(row, col))
+        self._endCell = self.getCell(row, col)
+
+    def setObstacleGrid(self, obstacles):
+        '''
+        Replaces every obstacle of the world with the row major obstacle flags,
+        one per cell.  The start and end cells are cleared.
+        '''
+        if len(obstacles) != self._NUM_ROWS * self._NUM_COLS:
+            raise ValueError('Expected {0} obstacle flags, got {1}'.format(
+                self._NUM_ROWS * self._NUM_COLS, len(obstacles)))
         self._resetWorldData()
-        
-        #Randomly set all cells in the world to an obstacle or not
-        for row in range(0, self._NUM_ROWS):
-            for col in range(0, self._NUM_COLS):
-                if random.random() < density:
-                    self._data[row][col].setObstacle(True)
+        self._obstacles[:] = bytes(bytearray(obstacles)).translate(_FLAG_TABLE)
+        self._bumpVersion()
+        self._notifyObstacleListeners(None, None)
 
-        unedited = copy.deepcopy(self._data)
+    def setObstacle(self, row, col, value):
+        '''
+        Sets or clears the obstacle at [row,col].  The move masks of the cell
+        and its neighbors are patched and the connected region labels are
+        updated, or dropped if the new obstacle may have split a region.
+        Nothing happens, not even a version change, if the cell already has
+        the value.
+        '''
+        index = row * self._NUM_COLS + col
+        if (self._obstacles[index] != 0) == bool(value):
+            return
+        self._obstacles[index] = 1 if value else 0
+        self._updateComponentLabels(row, col)
+        self._endpointConnection = None
 
-        #Now try to clump together obstacles and free paths
+        if self._moveMasks is not None:
+            for nRow in range(max(0, row - 1), min(self._NUM_ROWS, row + 2)):
+                for nCol in range(max(0, col - 1), min(self._NUM_COLS, col + 2)):
+                    self._moveMasks[nRow * self._NUM_COLS + nCol] = self._cellMoveMask(nRow, nCol)
+
+        self._bumpVersion()
+        self._notifyObstacleListeners(row, col)
+
+    def getVersion(self):
+        '''
+        Get a counter that goes up whenever an obstacle changes, through
+        setObstacle(), setObstacleGrid() or reset().  Results computed for one
+        version of the world stay valid while the version is unchanged.
+        '''
+        return self._version
+
+    def _bumpVersion(self):
+        self._version += 1
+        self._derivedData = {}
+
+    def getDerivedData(self, key):
+        '''
+        Get the data stored with setDerivedData() under the key for the
+        current version of the world, or None.
+        '''
+        entry = self._derivedData.get(key)
+        if entry is None or entry[0] != self._version:
+            return None
+        return entry[1]
+
+    def setDerivedData(self, key, value):
+        '''
+        Stores data computed from the current obstacles, such as landmark
+        distance tables, so later searches of the same version of the world
+        can reuse it.  Everything stored is dropped when an obstacle changes.
+        '''
+        self._derivedData[key] = (self._version, value)
+
+    def addObstacleListener(self, listener):
+        '''
+        Calls listener(row, col) after the obstacle at [row,col] was changed by
+        setObstacle(), or listener(None, None) after every obstacle of the
+        world was replaced by reset() or setObstacleGrid().
+        '''
+        self._obstacleListeners.append(listener)
+
+    def removeObstacleListener(self, listener):
+        if listener in self._obstacleListeners:
+            self._obstacleListeners.remove(listener)
+
+    def _notifyObstacleListeners(self, row, col):
+        for listener in list(self._obstacleListeners):
+            listener(row, col)
+
+    def isSolvable(self):
+        '''
+        Checks if a path exists between the start and end cells.  Generated
+        worlds are known to be solvable, otherwise the connected region labels
+        are consulted.
+        '''
+        if self._startCell is None or self._endCell is None:
+            return False
+        connected = self._getKnownConnection()
+        if connected is None:
+            connected = self.areConnected(self._startCell.row, self._startCell.column,
+                                          self._endCell.row, self._endCell.column)
+            self._recordConnection(connected)
+        return connected
+
+    def isKnownUnsolvable(self):
+        '''
+        Checks if the start and end cells are known to lie in different
+        connected regions.  The region labels are computed the first time
+        they are needed for the current obstacle grid, but unlike isSolvable()
+        this does not compute them again after setObstacle() dropped them, so
+        it is False while they are out of date.  A start or end cell inside an
+        obstacle is never connected.
+        '''
+        if self._startCell is None or self._endCell is None:
+            return True
+        if self._startCell.isObstacle() or self._endCell.isObstacle():
+            return True
+        connected = self._getKnownConnection()
+        if connected is None:
+            if self._componentLabels is None and self._labelsDropped:
+                return False
+            connected = self.areConnected(self._startCell.row, self._startCell.column,
+                                          self._endCell.row, self._endCell.column)
+            self._recordConnection(connected)
+        return not connected
+
+    def _getKnownConnection(self):
+        '''
+        Returns whether the current start and end cells are connected if that
+        is known for the current obstacles, otherwise None.  The answer is kept
+        for the last pair of endpoints it was found for, so moving the
+        endpoints away and back does not lose it.
+        '''
+        entry = self._endpointConnection
+        if (entry is None or entry[0] != self._startCell._index or
+                entry[1] != self._endCell._index):
+            return None
+        return entry[2]
+
+    def _recordConnection(self, connected):
+        self._endpointConnection = (self._startCell._index, self._endCell._index, connected)
+
+    def areConnected(self, fromRow, fromCol, toRow, toCol):
+        '''
+        Checks if a path exists between the cells at [fromRow,fromCol] and
+        [toRow,toCol].
+        '''
+        label = self.getComponentLabel(fromRow, fromCol)
+        return label != 0 and label == self.getComponentLabel(toRow, toCol)
+
+    def getComponentLabel(self, row, col):
+        '''
+        Gets the label of the connected region of open cells containing the
+        cell at [row,col], or 0 if the cell is an obstacle.  The labels of all
+        cells are computed once and kept up to date by setObstacle() until an
+        obstacle may split a region.
+        '''
+        if self._componentLabels is None:
+            self._componentLabels, numLabels = self._labelComponents()
+            self._labelParents = array('i', range(0, numLabels + 1))
+            self._labelsDropped = False
+        return self._findLabel(self._componentLabels[row * self._NUM_COLS + col])
+
+    def _findLabel(self, label):
+        '''
+        Follows merged region labels to the label that stands for the region.
+        '''
+        parents = self._labelParents
+        while parents[label] != label:
+            parents[label] = parents[parents[label]]
+            label = parents[label]
+        return label
+
+    def _updateComponentLabels(self, row, col):
+        '''
+        Updates the region labels after the obstacle at [row,col] changed.  A
+        cleared cell joins the regions of its open neighbors, which are merged
+        by pointing their labels at the lowest one.  A new obstacle only drops
+        the labels if its open neighbors are not linked around it, as only
+        then may it split their region.
+        '''
+        labels = self._componentLabels
+        if labels is None:
+            return
+        index = row * self._NUM_COLS + col
+        if self._obstacles[index]:
+            labels[index] = 0
+            if self._maySplitRegion(row, col):
+                self._componentLabels = None
+                self._labelParents = None
+                self._labelsDropped = True
+            return
+
+        neighborLabels = set()
+        for rowStep, colStep in _MOVE_DIRECTIONS[:4]:
+            nRow = row + rowStep
+            nCol = col + colStep
+            if self._isValidCoordinate(nRow, nCol):
+                label = labels[nRow * self._NUM_COLS + nCol]
+                if label:
+                    neighborLabels.add(self._findLabel(label))
+        if neighborLabels:
+            label = min(neighborLabels)
+            for other in neighborLabels:
+                self._labelParents[other] = label
+        else:
+            label = len(self._labelParents)
+            self._labelParents.append(label)
+        labels[index] = label
+
+    def _maySplitRegion(self, row, col):
+        '''
+        Checks if the open straight neighbors of the obstacle at [row,col]
+        fall apart into more than one group when only the eight cells around
+        it are used to link them.  Neighbors that are linked there stay
+        connected, others may only have been connected through the cell.
+        '''
+        def isOpen(rowStep, colStep):
+            return (self._isValidCoordinate(row + rowStep, col + colStep) and
+                    not self._obstacles[(row + rowStep) * self._NUM_COLS + col + colStep])
+
+        #The straight neighbors in order around the cell, so each one shares
+        #a corner cell with the next
+        around = ((-1, 0), (0, 1), (1, 0), (0, -1))
+        numOpen = 0
+        numLinks = 0
+        for pos, (rowStep, colStep) in enumerate(around):
+            if not isOpen(rowStep, colStep):
+                continue
+            numOpen += 1
+            nextRowStep, nextColStep = around[(pos + 1) % 4]
+            if isOpen(nextRowStep, nextColStep) and isOpen(rowStep + nextRowStep, colStep + nextColStep):
+                numLinks += 1
+        return numOpen - numLinks > 1
+
+    def _labelComponents(self):
+        '''
+        Returns a row major array labelling the connected regions of open cells
+        with 1, 2, 3, ... and obstacles with 0, and the number of regions.
+
+        Diagonal moves need one of their two corner cells to be open, and that
+        corner links the same cells with straight moves.  So the regions are
+        the straight line connected ones.  They are found with union-find over
+        the horizontal runs of open cells, joining runs that overlap a run of
+        the row above.
+        '''
+        numCols = self._NUM_COLS
+        obstacles = self._obstacles
+        find = obstacles.find
+        runStarts = array('i')
+        runEnds = array('i')
+        parents = array('i')
+
+        #Runs are joined by pointing the root with the higher index at the
+        #root with the lower index, so every run's parent precedes it.
+        prevFirst = 0
+        for rowStart in range(0, len(obstacles), numCols):
+            rowEnd = rowStart + numCols
+            first = len(runStarts)
+            above = prevFirst
+            pos = find(0, rowStart, rowEnd)
+            while pos >= 0:
+                end = find(1, pos, rowEnd)
+                if end < 0:
+                    end = rowEnd
+                run = len(runStarts)
+                runStarts.append(pos)
+                runEnds.append(end)
+                parents.append(run)
+
+                #Join every run of the row above that overlaps this one.  The
+                #last of them may also overlap the next run of this row.
+                while above < first and runEnds[above] + numCols <= pos:
+                    above += 1
+                root = run
+                while above < first and runStarts[above] + numCols < end:
+                    rootAbove = above
+                    while parents[rootAbove] != rootAbove:
+                        parents[rootAbove] = parents[parents[rootAbove]]
+                        rootAbove = parents[rootAbove]
+                    if rootAbove < root:
+                        parents[root] = rootAbove
+                        root = rootAbove
+                    elif rootAbove > root:
+                        parents[rootAbove] = root
+                    if runEnds[above] + numCols > end:
+                        break
+                    above += 1
+                pos = find(0, end, rowEnd)
+            prevFirst = first
+
+        #Resolving the runs in order leaves every parent pointing at its root
+        #before the runs after it look it up.
+        labels = array('i', bytes(len(obstacles) * array('i').itemsize))
+        rootLabels = {}
+        for run in range(0, len(runStarts)):
+            root = parents[parents[run]]
+            parents[run] = root
+            label = rootLabels.get(root)
+            if label is None:
+                label = len(rootLabels) + 1
+                rootLabels[root] = label
+            labels[runStarts[run]:runEnds[run]] = array('i', [label]) * (runEnds[run] - runStarts[run])
+        return labels, len(rootLabels)
+
+    def _generateObstacles(self, density, smoothIterations, rng):
+        '''
+        Clears the world and fills it with randomly placed, clumped obstacles.
+        '''
+        self._resetWorldData()
+
+        #Randomly set all cells in the world to an obstacle or not.  Every row
+        #is filled from one block of random bytes that is mapped to obstacle
+        #flags by a translation table.
+        threshold = int(round(density * 256))
+        fillTable = bytes(bytearray(1 if value < threshold else 0
+                                    for value in range(256)))
+        numCols = self._NUM_COLS
         for row in range(0, self._NUM_ROWS):
-            for col in range(0, self._NUM_COLS):
-                obstacleNeighborCnt = self._countObstacleNeighbors(unedited, row, col)
-                if obstacleNeighborCnt > 3:
-                    self._data[row][col].setObstacle(True)
-                elif obstacleNeighborCnt < 2:
-                    self._data[row][col].setObstacle(False)
-                    
+            noise = rng.getrandbits(8 * numCols).to_bytes(numCols, 'little')
+            self._obstacles[row * numCols:(row + 1) * numCols] = noise.translate(fillTable)
+
+        #Now try to clump together obstacles and free paths
+        for _ in range(0, smoothIterations):
+            self._clumpObstacles()
+
+    def _placeEndpoints(self, maxCandidates=32):
+        '''
+        Picks connected start and end cells for a freshly generated world and
+        returns their (row, col) coordinates.  If no connected pair is found
+        among maxCandidates candidate cells then the end coordinate is -1,-1.
+
+        Fills grow from the start and end candidates at the same time.  If
+        they meet the pair is connected, if one of them runs out of cells first
+        it was sealed in a pocket and the next most uncrowded cell outside of
+        that pocket becomes the new candidate for its side.  Pockets are small
+        so failed candidates are cheap and the fills from connected candidates
+        head for each other.
+        '''
         # This searches for a suitable start cell in the lower left 13% of the grid
-        # and an end patch in the upper right 13% of the grid. "Suitable" is defined 
+        # and an end patch in the upper right 13% of the grid. "Suitable" is defined
         #as any cell with most neighbors unoccupied which is more likely than most
         # to have reachability
-        xLimit = self._NUM_COLS / 8
-        yLimit = self._NUM_ROWS / 8
-        
-        start = self._findOpenCell(xLimit, yLimit, self._NUM_ROWS - xLimit, 0)
-        end = self._findOpenCell(xLimit, yLimit, 
-                                 0, self._NUM_COLS - yLimit)
-        
-        while (start.row == -1 and start.column == -1 and 
-               end.row == -1 and end.column == -1):
-            self.reset(density)
-        self._startCell = start
-        self._endCell = end
-        
-    def _findOpenCell(self, xLimit, yLimit, row, col):
+        xLimit = max(1, self._NUM_ROWS // 8)
+        yLimit = max(1, self._NUM_COLS // 8)
+        regions = ((xLimit, yLimit, self._NUM_ROWS - xLimit, 0),
+                   (xLimit, yLimit, 0, self._NUM_COLS - yLimit))
+
+        #Cells filled by each side are marked in a copy of the obstacle grid
+        grid = bytearray(self._obstacles)
+        cells = [(-1, -1), (-1, -1)]
+        fills = [None, None]
+        nextMark = 2
+
+        for _ in range(0, maxCandidates):
+            #Replace the candidate of every side without a live fill.  Cells
+            #already filled from the other side are connected to it.
+            for side in (0, 1):
+                if fills[side] is not None:
+                    continue
+                otherMark = fills[1 - side].mark if fills[1 - side] else 0
+                cells[side] = self._findOpenCell(*regions[side], cells=grid,
+                                                 openValues=(0, otherMark))
+                if cells[side] == (-1, -1):
+                    return cells[0], (-1, -1)
+                index = cells[side][0] * self._NUM_COLS + cells[side][1]
+                if otherMark and grid[index] == otherMark:
+                    return cells[0], cells[1]
+                fills[side] = _ScanlineFill(grid, self._NUM_COLS, index, nextMark)
+                nextMark += 1
+
+            fills[0].setTarget(cells[1], fills[1].mark)
+            fills[1].setTarget(cells[0], fills[0].mark)
+            while fills[0].advance() and fills[1].advance():
+                pass
+            if fills[0].met or fills[1].met:
+                return cells[0], cells[1]
+
+            #Drop the side whose fill ran out of cells
+            for side in (0, 1):
+                if fills[side].isExhausted():
+                    fills[side] = None
+                    break
+
+        return cells[0], (-1, -1)
+
+    def _clearCorridor(self, start, end):
+        '''
+        Clears a staircase of straight moves from the start to the end
+        coordinate so that the two are connected.
+        '''
+        row, col = start
+        endRow, endCol = end
+        self._obstacles[row * self._NUM_COLS + col] = 0
+        while (row, col) != (endRow, endCol):
+            if abs(endRow - row) >= abs(endCol - col):
+                row += 1 if endRow > row else -1
+            else:
+                col += 1 if endCol > col else -1
+            self._obstacles[row * self._NUM_COLS + col] = 0
+
+    def _clumpObstacles(self):
+        '''
+        Runs one cellular automaton pass over the obstacle grid.  Crowded cells
+        become obstacles and lonely cells are cleared, all based on the grid as
+        it was before the pass.  Each row is rewritten in place as soon as its
+        counts are known because the counts are computed from rows that were
+        read before any of them changed.
+        '''
+        numCols = self._NUM_COLS
+        for row, counts, cells in self._iterNeighborCounts(0, self._NUM_ROWS):
+            update = ((counts << 1) + cells).to_bytes(numCols, 'little')
+            self._obstacles[row * numCols:(row + 1) * numCols] = update.translate(_CLUMP_TABLE)
+
+    def _findOpenCell(self, xLimit, yLimit, row, col, cells=None, openValues=(0,)):
         '''
         Searches from coordinate row,col to row+xLimit,col+yLimit for the most
-        uncrowded open cell.  If all cells are blocked then the cell returned
-        here have a row,col coordinate of -1,-1.
-        '''
-        mostClearCell = WorldCell()
-        #Worst case is all 8 neighbors cells are blocked
-        lowestCnt = 8
-        
-        for x in range(row, row+xLimit):
-            for y in range(col, col+yLimit):
-                localCnt = self._countObstacleNeighbors(self._data, x, y)
-                if localCnt < lowestCnt:
-                    lowestCnt = localCnt
-                    mostClearCell.row = x
-                    mostClearCell.column = y
+        uncrowded open cell and returns its (row, col) coordinate.  A cell is
+        open when its value in the row major cells grid is one of openValues,
+        the obstacle grid is used by default.  If all cells are blocked then
+        the coordinate returned is -1,-1.
+        '''
+        if cells is None:
+            cells = self._obstacles
+        mostClearCell = (-1, -1)
+        #Blocked cells get a count above the worst case of all 8 neighbors
+        #cells being obstacles
+        lowestCnt = 9
+        blockedTable = bytes(bytearray(0 if value in openValues else 9
+                                       for value in range(256)))
+
+        for x, counts, _ in self._iterNeighborCounts(row, row+xLimit):
+            offset = x * self._NUM_COLS + col
+            blocked = cells[offset:offset+yLimit].translate(blockedTable)
+            counts = (counts >> (8 * col)) + int.from_bytes(blocked, 'little')
+            counts = counts.to_bytes(self._NUM_COLS, 'little')[0:yLimit]
+            localCnt = min(counts)
+            if localCnt < lowestCnt:
+                lowestCnt = localCnt
+                mostClearCell = (x, col + counts.index(localCnt))
         return mostClearCell
-                    
-    def _countObstacleNeighbors(self, data, row, col):
-        '''
-        Checks the cells around a given location to count the number of obstacles
-        around it.  Cells on the border of the world are treated as having clear
-        neighbor cells beyond the border.
-        '''
-        obstacleNeighborCnt = 0
-        neighbors = self.getNeighbors(row, col, data)
-        for cell in neighbors:
-            if cell.isObstacle():
-                obstacleNeighborCnt = obstacleNeighborCnt + 1
-            
-        return obstacleNeighborCnt
-    
+
+    def _iterNeighborCounts(self, firstRow, endRow):
+        '''
+        Yields (row, counts, cells) for every row in [firstRow, endRow).  The
+        row's cells and the number of obstacles around each of them are packed
+        into integers with one byte per column, least significant byte first.
+        Cells on the border of the world are treated as having clear neighbor
+        cells beyond the border.
+
+        The counts are a 3x3 box sum minus the cell itself.  Shifting a packed
+        row by one byte lines every cell up with its left or right neighbor,
+        so each row's horizontal sums are computed once and added to the sums
+        of the rows above and below.  A box sum never exceeds 9 and so never
+        carries into the next column's byte.
+        '''
+        numCols = self._NUM_COLS
+        rowMask = (1 << (8 * numCols)) - 1
+
+        def packedRow(row):
+            if row < 0 or row >= self._NUM_ROWS:
+                return 0
+            return int.from_bytes(self._obstacles[row * numCols:(row + 1) * numCols], 'little')
+
+        def horizontalSums(cells):
+            return ((cells << 8) & rowMask) + cells + (cells >> 8)
+
+        cells = packedRow(firstRow)
+        aboveSums = horizontalSums(packedRow(firstRow - 1))
+        cellSums = horizontalSums(cells)
+        for row in range(firstRow, endRow):
+            below = packedRow(row + 1)
+            belowSums = horizontalSums(below)
+            yield row, aboveSums + cellSums + belowSums - cells, cells
+            aboveSums = cellSums
+            cellSums = belowSums
+            cells = below
+
     def getCell(self, row, col):
-        return self._data[row][col]
-    
-    def getNeighbors(self, row, col, data = None):
+        return WorldCell(self, row, col)
+
+    def getCellIndex(self, row, col):
+        '''
+        Gets the position of the cell at [row,col] in the flat, row major
+        world arrays.
+        '''
+        return row * self._NUM_COLS + col
+
+    def getCellByIndex(self, index):
+        '''
+        Gets the cell at the given position of the flat, row major world
+        arrays.
+        '''
+        row, col = divmod(index, self._NUM_COLS)
+        return WorldCell(self, row, col)
+
+    def packPath(self, indices):
+        '''
+        Gets the cells at the given positions of the flat, row major world
+        arrays as a flat array of row, column pairs, the form in which paths
+        are returned.
+        '''
+        numCols = self._NUM_COLS
+        path = array('i')
+        append = path.append
+        for index in indices:
+            row = index // numCols
+            append(row)
+            append(index - row * numCols)
+        return path
+
+    def tracePath(self, cameFrom, index):
+        '''
+        Follows the links of a row major array of previous cell indices, like
+        the one of getPrevCellArray(), from the cell at the index to a cell
+        linked to -1 and returns the cells passed like packPath().
+        '''
+        indices = []
+        while index != -1:
+            indices.append(index)
+            index = cameFrom[index]
+        return self.packPath(indices)
+
+    def getObstacleGrid(self):
+        '''
+        Gets the row major bytearray holding a non-zero byte for every
+        obstacle cell.
+        '''
+        return self._obstacles
+
+    def getDistanceTraveledArray(self):
+        '''
+        Gets the row major array of distances traveled to each cell.
+        '''
+        if self._distTraveled is None:
+            self._allocateSearchArrays()
+        return self._distTraveled
+
+    def getEstimatedCostArray(self):
+        '''
+        Gets the row major array of estimated path costs through each cell.
+        '''
+        if self._pathCost is None:
+            self._allocateSearchArrays()
+        return self._pathCost
+
+    def getPrevCellArray(self):
+        '''
+        Gets the row major array holding the index of the previous cell in the
+        path of each cell, or -1 if the cell has no previous cell.
+        '''
+        if self._cameFrom is None:
+            self._allocateSearchArrays()
+        return self._cameFrom
+
+    def getNeighbors(self, row, col):
         '''
         Gets all the valid (in world bounds) cells surrounding the specified cell.
         '''
-        if data is None:
-            data = self._data
-      
         neighbors = []
-        
+
         #Check row above
-        if self._isValidCoordinate(row-1, col-1, data):
-            neighbors.append(data[row-1][col-1])
-        if self._isValidCoordinate(row-1, col, data):
-            neighbors.append(data[row-1][col])
-        if self._isValidCoordinate(row-1, col+1, data):
-            neighbors.append(data[row-1][col+1])
-            
+        if self._isValidCoordinate(row-1, col-1):
+            neighbors.append(self.getCell(row-1, col-1))
+        if self._isValidCoordinate(row-1, col):
+            neighbors.append(self.getCell(row-1, col))
+        if self._isValidCoordinate(row-1, col+1):
+            neighbors.append(self.getCell(row-1, col+1))
+
         #Check left and right sides
-        if self._isValidCoordinate(row, col-1, data):
-            neighbors.append(data[row][col-1])                
-        if self._isValidCoordinate(row, col+1, data):
-            neighbors.append(data[row][col+1])
-        
-        #Check row below                
-        if self._isValidCoordinate(row+1, col-1, data):
-            neighbors.append(data[row+1][col-1])            
-        if self._isValidCoordinate(row+1, col, data):
-            neighbors.append(data[row+1][col])    
-        if self._isValidCoordinate(row+1, col+1, data):
-            neighbors.append(data[row+1][col+1])
-        
+        if self._isValidCoordinate(row, col-1):
+            neighbors.append(self.getCell(row, col-1))
+        if self._isValidCoordinate(row, col+1):
+            neighbors.append(self.getCell(row, col+1))
+
+        #Check row below
+        if self._isValidCoordinate(row+1, col-1):
+            neighbors.append(self.getCell(row+1, col-1))
+        if self._isValidCoordinate(row+1, col):
+            neighbors.append(self.getCell(row+1, col))
+        if self._isValidCoordinate(row+1, col+1):
+            neighbors.append(self.getCell(row+1, col+1))
+
         return neighbors
 
     def getTraversableNeighbors(self, row, col):
@@ -232,62 +841,204 @@ class WorldModel(object):
         Returns a list of all neighbors of the cell at given [row,col] that
         can be traveled across.
         '''
-        neighbors = []
-        up = None
-        down = None
-        left = None
-        right = None
-        
-        #Check simple up/down/left/right directions
-        if self._isValidCoordinate(row-1, col):
-            up = self._data[row-1][col]
-        if self._isValidCoordinate(row+1, col):
-            down = self._data[row+1][col]    
-        if self._isValidCoordinate(row, col-1):
-            left = self._data[row][col-1]    
-        if self._isValidCoordinate(row, col+1):
-            right = self._data[row][col+1]    
-            
-        if up != None and not up.isObstacle():
-            neighbors.append(up)
-        if down != None and not down.isObstacle():
-            neighbors.append(down)
-        if left != None and not left.isObstacle():
-            neighbors.append(left)
-        if right != None and not right.isObstacle():
-            neighbors.append(right)
-            
-        #Check if diagonals are traversable.  Only passable if one of the
-        #component directions are clear.
-        if up != None and left != None:
-            if not (up.isObstacle() and left.isObstacle()) and not \
-            self._data[row-1][col-1].isObstacle():
-                neighbors.append(self._data[row-1][col-1])
-        if up != None and right != None:
-            if not (up.isObstacle() and right.isObstacle()) and not \
-            self._data[row-1][col+1].isObstacle():
-                neighbors.append(self._data[row-1][col+1])
-        if down != None and left != None:
-            if not (down.isObstacle() and left.isObstacle()) and not \
-            self._data[row+1][col-1].isObstacle():
-                neighbors.append(self._data[row+1][col-1])
-        if down != None and right != None:
-            if not (down.isObstacle() and right.isObstacle()) and not \
-            self._data[row+1][col+1].isObstacle():
-                neighbors.append(self._data[row+1][col+1])                                        
-        
-        return neighbors
-            
-    def _isValidCoordinate(self, row, col, data = None):
+        index = row * self._NUM_COLS + col
+        return [self.getCellByIndex(neighbor)
+                for neighbor, _ in self.getTraversableMoves(index)]
+
+    def getTraversableMoves(self, index):
+        '''
+        Returns a list of (neighbor index, step cost) pairs for all neighbors
+        of the cell at the given index that can be traveled across.
+        '''
+        moves = self.getMoveTable()[self.getMoveMasks()[index]]
+        return [(index + offset, stepCost) for offset, stepCost in moves]
+
+    def getMoveMasks(self):
+        '''
+        Gets the row major bytearray of move masks.  Bit n of a cell's mask is
+        set when the nth move of _MOVE_DIRECTIONS leads to a traversable
+        neighbor.  The masks are built once per world and patched whenever an
+        obstacle changes.
+        '''
+        if self._moveMasks is None:
+            self._moveMasks = self._buildMoveMasks()
+        return self._moveMasks
+
+    def getMoveTable(self):
+        '''
+        Gets the list mapping every move mask to a tuple of (index offset, step
+        cost) pairs, one for each move set in the mask.  Adding an offset to a
+        cell's index gives the index of the neighbor it moves to.
+        '''
+        return self._moveTable
+
+    def _buildMoveTable(self):
+        moves = [(rowStep * self._NUM_COLS + colStep,
+                  _DIAGONAL_COST if rowStep and colStep else 1.0)
+                 for rowStep, colStep in _MOVE_DIRECTIONS]
+        return [tuple(move for bit, move in enumerate(moves) if mask & (1 << bit))
+                for mask in range(256)]
+
+    def _buildMoveMasks(self):
+        '''
+        Computes the move masks of every cell.  Each row is packed into an
+        integer with one byte per column holding 1 for open cells, so every
+        move bit is a combination of shifted rows.  Bits never cross into the
+        next column's byte.  Obstacles have no moves, so a start or end cell
+        inside one is never connected to anything.
+        '''
+        numCols = self._NUM_COLS
+        rowMask = (1 << (8 * numCols)) - 1
+        openTable = bytes(bytearray(1 if value == 0 else 0 for value in range(256)))
+
+        def packedRow(row):
+            if row < 0 or row >= self._NUM_ROWS:
+                return 0
+            cells = self._obstacles[row * numCols:(row + 1) * numCols]
+            return int.from_bytes(cells.translate(openTable), 'little')
+
+        masks = bytearray(len(self._obstacles))
+        above = packedRow(-1)
+        cells = packedRow(0)
+        for row in range(0, self._NUM_ROWS):
+            below = packedRow(row + 1)
+            #Diagonals are only passable if one of the component directions
+            #are clear.
+            left = (cells << 8) & rowMask
+            right = cells >> 8
+            upLeft = ((above << 8) & rowMask) & (above | left)
+            upRight = (above >> 8) & (above | right)
+            downLeft = ((below << 8) & rowMask) & (below | left)
+            downRight = (below >> 8) & (below | right)
+            rowMasks = (above | below << 1 | left << 2 | right << 3 |
+                        upLeft << 4 | upRight << 5 | downLeft << 6 | downRight << 7)
+            #Spreading each open cell's 1 to all 8 bits of its byte keeps the
+            #masks of open cells only
+            rowMasks &= cells * 0xFF
+            masks[row * numCols:(row + 1) * numCols] = rowMasks.to_bytes(numCols, 'little')
+            above = cells
+            cells = below
+        return masks
+
+    def _cellMoveMask(self, row, col):
+        '''
+        Computes the move mask of the cell at [row,col], which is 0 for an
+        obstacle.
+        '''
+        if self._obstacles[row * self._NUM_COLS + col]:
+            return 0
+
+        def isOpen(rowStep, colStep):
+            return (self._isValidCoordinate(row + rowStep, col + colStep) and
+                    not self._obstacles[(row + rowStep) * self._NUM_COLS + col + colStep])
+
+        mask = 0
+        for bit, (rowStep, colStep) in enumerate(_MOVE_DIRECTIONS):
+            #Diagonals are only passable if one of the component directions
+            #are clear.
+            if isOpen(rowStep, colStep) and (not (rowStep and colStep) or
+                                             isOpen(rowStep, 0) or isOpen(0, colStep)):
+                mask |= 1 << bit
+        return mask
+
+    def _isValidCoordinate(self, row, col):
         '''
         Checks if the given coordinates are within bounds of the world.
         '''
-        if data is None:
-            data = self._data
-        
         valid = True
         if row < 0 or row >= self._NUM_ROWS:
             valid = False
         if col < 0 or col >= self._NUM_COLS:
             valid = False
-        return valid
\ No newline at end of file
+        return valid
+
+class _ScanlineFill(object):
+    '''
+    Incremental flood fill over the open cells of a row major grid in which
+    open cells are 0 and obstacles are 1.  Every filled cell is set to the
+    fill's mark.  The fill grows one horizontal run of open cells at a time,
+    runs closest to a target cell first, and stops when it touches a cell
+    marked by another fill.
+
+    Diagonal moves need one of their two corner cells to be open, and that
+    corner links the same cells with straight moves.  So the region reachable
+    with diagonal moves is the straight line connected region that is filled
+    here.  Runs are always filled completely so open cells are never next to
+    filled cells of the same row.
+    '''
+
+    def __init__(self, grid, numCols, seed, mark):
+        self.mark = mark
+        self.met = False
+        self._grid = grid
+        self._numCols = numCols
+        self._markRun = bytearray([mark])
+        self._seeds = [(0, seed)]
+        self._targetRow = 0
+        self._targetCol = 0
+        self._otherMark = -1
+
+    def setTarget(self, cell, otherMark):
+        '''
+        Steers the fill towards the (row, col) cell and makes it stop when it
+        touches cells with the otherMark mark.
+        '''
+        self._targetRow, self._targetCol = cell
+        self._otherMark = otherMark
+
+    def isExhausted(self):
+        return not self.met and not self._seeds
+
+    def advance(self):
+        '''
+        Fills the next run.  Returns False once the fill has met the other
+        fill or there is nothing left to fill.
+        '''
+        grid = self._grid
+        numCols = self._numCols
+        while self._seeds:
+            _, seed = heappop(self._seeds)
+            if grid[seed] == self._otherMark:
+                self.met = True
+                return False
+            if grid[seed] == 0:
+                break
+        else:
+            return False
+
+        #Extend the seed to the whole run of open cells in its row
+        rowStart = seed - seed % numCols
+        rowEnd = rowStart + numCols
+        runStart = max(grid.rfind(1, rowStart, seed) + 1, rowStart)
+        runEnd = grid.find(1, seed, rowEnd)
+        if runEnd < 0:
+            runEnd = rowEnd
+        grid[runStart:runEnd] = self._markRun * (runEnd - runStart)
+
+        #Seed every open run touching this one in the rows above and below
+        for offset in (-numCols, numCols):
+            first = runStart + offset
+            last = runEnd + offset
+            if first < 0 or last > len(grid):
+                continue
+            if grid.find(self._otherMark, first, last) >= 0:
+                self.met = True
+                return False
+            pos = grid.find(0, first, last)
+            while pos >= 0:
+                end = grid.find(1, pos, last)
+                if end < 0:
+                    end = last
+                heappush(self._seeds, (self._distanceToTarget(pos, end), pos))
+                pos = grid.find(0, end, last)
+        return True
+
+    def _distanceToTarget(self, runStart, runEnd):
+        '''
+        Gets the straight move distance from the run [runStart, runEnd) to the
+        target cell.
+        '''
+        row, firstCol = divmod(runStart, self._numCols)
+        lastCol = firstCol + runEnd - runStart - 1
+        col = min(max(self._targetCol, firstCol), lastCol)
+        return abs(row - self._targetRow) + abs(col - self._targetCol)
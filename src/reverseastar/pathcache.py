@@ -0,0 +1,128 @@
+from collections import OrderedDict
+
+import algorithm
+
+#Rough size of a cache entry apart from its path: the key tuple, the result
+#tuple, the cost and the ordered dictionary's bookkeeping
+_ENTRY_OVERHEAD = 200
+
+class PathCache(object):
+    '''
+    Remembers the paths found between pairs of cells of a world model so a
+    repeated query is answered by a dictionary lookup instead of a search.
+    Results are keyed by the world's version (see WorldModel.getVersion())
+    and the two cells, so a changed obstacle never returns a stale path.
+    Entries of older versions can never be hit again and are dropped as soon
+    as a newer version is seen.
+
+    The least recently used results are evicted once the estimated size of
+    the cached paths exceeds maxBytes.  Queries that find no path are
+    cached as well.  The returned path arrays are shared between hits and
+    must not be changed.
+
+    Misses are solved with alg, an algorithm attached to the same world
+    model, by default a ReverseAStarAlgorithm.
+    '''
+
+    def __init__(self, model, alg=None, maxBytes=64 * 1024 * 1024):
+        self._worldModel = model
+        self._alg = alg if alg is not None else algorithm.ReverseAStarAlgorithm(model)
+        self._maxBytes = maxBytes
+        self._entries = OrderedDict()
+        self._numBytes = 0
+        self._version = model.getVersion()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def solve(self):
+        '''
+        Finds the path from the world's start cell to its end cell and
+        returns (path, cost) like findPath().
+        '''
+        model = self._worldModel
+        startCell = model.getStartCell()
+        endCell = model.getEndCell()
+        if startCell is None or endCell is None:
+            return None, None
+        return self.findPath(startCell.row, startCell.column, endCell.row, endCell.column)
+
+    def findPath(self, startRow, startCol, endRow, endCol):
+        '''
+        Get the path from [startRow,startCol] to [endRow,endCol] as a flat
+        array of row, column pairs like ReverseAStarAlgorithm.getPath() and
+        its cost, or (None, None) if there is none.  A search moves the
+        world's start and end cells to the query's cells and back again
+        afterwards, if they were set.
+        '''
+        model = self._worldModel
+        version = model.getVersion()
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+        key = (version, model.getCellIndex(startRow, startCol), model.getCellIndex(endRow, endCol))
+        entries = self._entries
+        result = entries.get(key)
+        if result is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        result = self._search(startRow, startCol, endRow, endCol)
+        entries[key] = result
+        self._numBytes += self._entrySize(result)
+        while self._numBytes > self._maxBytes and len(entries) > 1:
+            _, evicted = entries.popitem(last=False)
+            self._numBytes -= self._entrySize(evicted)
+            self.evictions += 1
+        return result
+
+    def _search(self, startRow, startCol, endRow, endCol):
+        model = self._worldModel
+        startCell = model.getStartCell()
+        endCell = model.getEndCell()
+        model.setStartCell(startRow, startCol)
+        model.setEndCell(endRow, endCol)
+        try:
+            self._alg.reset()
+            return self._alg.solve()
+        finally:
+            if startCell is not None:
+                model.setStartCell(startCell.row, startCell.column)
+            if endCell is not None:
+                model.setEndCell(endCell.row, endCell.column)
+
+    def _entrySize(self, result):
+        path = result[0]
+        if path is None:
+            return _ENTRY_OVERHEAD
+        return _ENTRY_OVERHEAD + len(path) * path.itemsize
+
+    def clear(self):
+        '''
+        Drops every cached result.  The hit and miss counters are kept.
+        '''
+        self._entries.clear()
+        self._numBytes = 0
+
+    def getNumEntries(self):
+        return len(self._entries)
+
+    def getNumBytes(self):
+        '''
+        Get the estimated size of the cached results in bytes.
+        '''
+        return self._numBytes
+
+    def getStats(self):
+        '''
+        Get the hit, miss and eviction counters and the current size as a
+        dictionary.
+        '''
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._numBytes}
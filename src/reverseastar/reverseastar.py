@@ -4,7 +4,7 @@ from PySide.QtGui import QApplication
 
 import gui
 import model
-import algorithm
+import solver
 
 #Main launching point of the application.
 
@@ -15,8 +15,10 @@ if __name__ == '__main__':
     world = model.WorldModel()
     #Default to 30% obstacle coverage
     world.reset(0.3)
-    #Create the algorithm and attach the world to it.
-    alg = algorithm.ReverseAStarAlgorithm(world)
+    #Create the algorithm and attach the world to it.  The search engine can
+    #be picked by its name in solver.ENGINES as the first argument.
+    engine = sys.argv[1] if len(sys.argv) > 1 and sys.argv[1] in solver.ENGINES else 'astar'
+    alg = solver.ENGINES[engine](world)
     #Initialize the algorithm class settings
     alg.reset()
     #Launch the GUI
@@ -0,0 +1,71 @@
+import time
+
+import algorithm
+import anytime
+import bidirectional
+import heuristics
+import jps
+
+#Solving a single world without the GUI, shared by the headless command line
+#and the batch worker processes.
+
+#Search engines that can be picked by name
+ENGINES = {'anytime': anytime.AnytimeReverseAStar,
+           'astar': algorithm.ReverseAStarAlgorithm,
+           'bidir': bidirectional.BidirectionalAStar,
+           'jps': jps.JumpPointSearch}
+
+def solveWorld(world, alg=None, collectStats=False, heuristic=None, engine='astar',
+               timeBudget=None):
+    '''
+    Runs the Reverse A* algorithm on the world until it finds a path or
+    proves that there is none.  Returns a dictionary describing the result
+    that can be written out as JSON.  With collectStats the search counters
+    are added under 'stats'.  heuristic names one of the heuristics module's
+    heuristics to search with instead of the straight line distance, and
+    engine names the search engine from ENGINES used when alg is not given.
+    With a timeBudget the search stops after that many seconds; the anytime
+    engine then reports its best path so far and its suboptimality bound
+    under 'bound'.
+    '''
+    if alg is None:
+        alg = ENGINES[engine](world)
+    if heuristic is not None:
+        alg.setHeuristic(heuristics.createHeuristic(heuristic, world))
+    if collectStats and alg.getStats() is None:
+        alg.setStats(algorithm.SearchStats())
+
+    result = {'rows': world.getNumRows(),
+              'cols': world.getNumColumns(),
+              'start': None,
+              'end': None,
+              'solvable': False,
+              'done': False,
+              'cost': None,
+              'path': None,
+              'expanded': 0,
+              'solveSeconds': 0.0}
+
+    start = world.getStartCell()
+    end = world.getEndCell()
+    if start is None or end is None:
+        return result
+    result['start'] = [start.row, start.column]
+    result['end'] = [end.row, end.column]
+
+    begin = time.time()
+    alg.reset()
+    path, cost = alg.solve(timeBudget=timeBudget)
+    result['solveSeconds'] = time.time() - begin
+
+    result['solvable'] = alg.isSolvable()
+    result['done'] = alg.isDone()
+    result['expanded'] = alg.getNumVisitedCells()
+    if path is not None:
+        result['path'] = [path[i:i + 2].tolist() for i in range(0, len(path), 2)]
+        result['cost'] = cost
+    if isinstance(alg, anytime.AnytimeReverseAStar):
+        result['bound'] = alg.getSuboptimalityBound()
+    if alg.getStats() is not None:
+        result['stats'] = alg.getStats().asDict()
+    return result
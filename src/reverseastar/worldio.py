@@ -0,0 +1,326 @@
+import mmap
+import struct
+import sys
+from array import array
+
+import heuristics
+import model
+
+#Reading and writing worlds to files.
+
+#Characters of ASCII maps that are obstacles.  Everything else is open.  This
+#covers the common benchmark map format ('@', 'O', 'T' and 'W') as well as
+#plain '#' drawings.
+_ASCII_OBSTACLES = b'@OTW#'
+_ASCII_TABLE = bytes(bytearray(1 if value in bytearray(_ASCII_OBSTACLES) else 0
+                               for value in range(256)))
+
+#Binary world files start with a fixed little endian header:
+#
+#  magic           4 bytes, _BINARY_MAGIC
+#  version         uint16, _BINARY_VERSION
+#  flags           uint16, _HAS_GENERATION_PARAMS and _HAS_SEED
+#  rows, cols      uint32 each
+#  gridOffset      uint32, where the obstacle grid starts
+#  start, end      int32 row and column each, -1 if the cell is not set
+#  density         double          \
+#  smoothIterations int32           | generation parameters, zero when
+#  maxAttempts     int32            | the flags say they are missing
+#  seed            int64           /
+#  landmarkKey     uint32, number of landmarks asked for, 0 if none stored
+#  numLandmarks    uint32, number of landmark tables stored
+#  landmarkOffset  uint64, where the landmark tables start
+#
+#The obstacle grid follows at gridOffset with one bit per cell, 1 for
+#obstacles.  Every row starts on a new byte and cell col of a row is bit
+#col % 8 (least significant first) of the row's byte col // 8.  Readers use
+#gridOffset, so later versions can grow the header.
+#
+#Optional landmark tables (see heuristics.LandmarkHeuristic) start at the
+#8 byte aligned landmarkOffset: the landmark cells as int32 row and column
+#pairs followed by one table of rows * cols little endian doubles per
+#landmark.
+_BINARY_MAGIC = b'RASW'
+_BINARY_VERSION = 1
+_BINARY_PREFIX = struct.Struct('<4sH')
+_BINARY_HEADER = struct.Struct('<4sHHIIIiiiidiiqIIQ')
+_HAS_GENERATION_PARAMS = 1
+_HAS_SEED = 2
+
+#Range of the header's seed field
+_MIN_SEED = -2 ** 63
+_MAX_SEED = 2 ** 63 - 1
+
+#Binary digits of packed rows to obstacle flags and back
+_BITS_TO_FLAGS = bytes(bytearray(1 if value == ord('1') else 0 for value in range(256)))
+_FLAGS_TO_BITS = bytes(bytearray(ord('1') if value else ord('0') for value in range(256)))
+
+def readAsciiMap(path):
+    '''
+    Reads a world from an ASCII map file with one line of characters per row.
+    An optional header of 'type', 'height', 'width' and 'map' lines, as used
+    by the common grid benchmark maps, is skipped.  The start and end cells of
+    the returned world are not set.
+    '''
+    with open(path) as mapFile:
+        lines = [line.rstrip('\r\n') for line in mapFile]
+
+    #Skip the header if there is one
+    for lineNum, line in enumerate(lines):
+        if line.strip() == 'map':
+            lines = lines[lineNum + 1:]
+            break
+
+    rows = [line for line in lines if line.strip()]
+    if not rows:
+        raise ValueError('{0} does not contain a map'.format(path))
+    numCols = max(len(row) for row in rows)
+
+    obstacles = bytearray()
+    for row in rows:
+        obstacles += row.encode('ascii').ljust(numCols, b'.').translate(_ASCII_TABLE)
+
+    world = model.WorldModel(len(rows), numCols)
+    world.setObstacleGrid(obstacles)
+    return world
+
+def writeWorld(world, path, numLandmarks=0):
+    '''
+    Writes the world's obstacles, start and end cells and generation
+    parameters to a binary world file.  With numLandmarks the tables of a
+    LandmarkHeuristic with that many landmarks are stored as well, so the
+    worlds read back search with it without computing them again.
+    '''
+    numRows = world.getNumRows()
+    numCols = world.getNumColumns()
+    start = world.getStartCell()
+    end = world.getEndCell()
+    params = world.getGenerationParams()
+
+    flags = 0
+    density = 0.0
+    smoothIterations = 0
+    maxAttempts = 0
+    seed = 0
+    if params is not None:
+        flags |= _HAS_GENERATION_PARAMS
+        density = params['density']
+        smoothIterations = params['smoothIterations']
+        maxAttempts = params['maxAttempts']
+        #Seeds that do not fit the header are left out, the obstacles are
+        #stored either way
+        if params['seed'] is not None and _MIN_SEED <= params['seed'] <= _MAX_SEED:
+            flags |= _HAS_SEED
+            seed = params['seed']
+
+    landmarks = []
+    tables = []
+    if numLandmarks > 0:
+        heuristic = heuristics.LandmarkHeuristic(world, numLandmarks)
+        landmarks = heuristic.getLandmarks()
+        tables = heuristic.getTables()
+
+    rowBytes = (numCols + 7) // 8
+    gridEnd = _BINARY_HEADER.size + numRows * rowBytes
+    landmarkOffset = (gridEnd + 7) // 8 * 8 if numLandmarks > 0 else 0
+    header = _BINARY_HEADER.pack(_BINARY_MAGIC, _BINARY_VERSION, flags,
+                                 numRows, numCols, _BINARY_HEADER.size,
+                                 start.row if start else -1, start.column if start else -1,
+                                 end.row if end else -1, end.column if end else -1,
+                                 density, smoothIterations, maxAttempts, seed,
+                                 numLandmarks, len(tables), landmarkOffset)
+
+    obstacles = world.getObstacleGrid()
+    with open(path, 'wb') as worldFile:
+        worldFile.write(header)
+        for row in range(0, numRows):
+            #Written as binary digits, the first cell of the row ends up in
+            #the lowest bit
+            digits = obstacles[row * numCols:(row + 1) * numCols].translate(_FLAGS_TO_BITS)
+            bits = int(digits[::-1], 2) if numCols else 0
+            worldFile.write(bits.to_bytes(rowBytes, 'little'))
+
+        if numLandmarks > 0:
+            worldFile.write(bytes(landmarkOffset - gridEnd))
+            cells = array('i', [coord for cell in landmarks for coord in cell])
+            if sys.byteorder != 'little':
+                cells.byteswap()
+            worldFile.write(cells.tobytes())
+            for table in tables:
+                if sys.byteorder != 'little':
+                    table = array('d', table)
+                    table.byteswap()
+                worldFile.write(table.tobytes())
+
+def readWorld(path):
+    '''
+    Reads a world from a binary world file written by writeWorld().
+    '''
+    with WorldFile(path) as worldFile:
+        return worldFile.toWorldModel()
+
+class WorldFile(object):
+    '''
+    A binary world file mapped into memory.  Opening one only reads the
+    header, and the obstacles are read from the mapped pages when they are
+    asked for, so even a huge file opens at once and processes that map the
+    same file share its pages.  toWorldModel() unpacks the grid into a
+    WorldModel for searching, which takes a byte per cell.
+    '''
+
+    def __init__(self, path):
+        self._path = path
+        with open(path, 'rb') as worldFile:
+            try:
+                self._map = mmap.mmap(worldFile.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError('{0} is not a world file'.format(path))
+
+        if len(self._map) < _BINARY_PREFIX.size:
+            self.close()
+            raise ValueError('{0} is not a world file'.format(path))
+        magic, version = _BINARY_PREFIX.unpack_from(self._map)
+        if magic != _BINARY_MAGIC:
+            self.close()
+            raise ValueError('{0} is not a world file'.format(path))
+        if version != _BINARY_VERSION:
+            self.close()
+            raise ValueError('{0} has unsupported world file version {1}'.format(path, version))
+        if len(self._map) < _BINARY_HEADER.size:
+            self.close()
+            raise ValueError('{0} is truncated'.format(path))
+        (_, _, flags, numRows, numCols, gridOffset,
+         startRow, startCol, endRow, endCol,
+         density, smoothIterations, maxAttempts, seed,
+         landmarkKey, numLandmarks, landmarkOffset) = _BINARY_HEADER.unpack_from(self._map)
+
+        self._numRows = numRows
+        self._numCols = numCols
+        self._gridOffset = gridOffset
+        self._rowBytes = (numCols + 7) // 8
+        self._landmarkKey = landmarkKey
+        self._numLandmarks = numLandmarks
+        self._landmarkOffset = landmarkOffset
+        tableBytes = numRows * numCols * array('d').itemsize
+        if (len(self._map) < gridOffset + numRows * self._rowBytes or
+                len(self._map) < landmarkOffset + numLandmarks * (8 + tableBytes)):
+            self.close()
+            raise ValueError('{0} is truncated'.format(path))
+
+        self._start = (startRow, startCol) if startRow >= 0 else None
+        self._end = (endRow, endCol) if endRow >= 0 else None
+        self._generationParams = None
+        if flags & _HAS_GENERATION_PARAMS:
+            self._generationParams = {'density': density,
+                                      'smoothIterations': smoothIterations,
+                                      'maxAttempts': maxAttempts,
+                                      'seed': seed if flags & _HAS_SEED else None}
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.close()
+
+    def getNumRows(self):
+        return self._numRows
+
+    def getNumColumns(self):
+        return self._numCols
+
+    def getStartCell(self):
+        '''
+        Get the start cell as a (row, col) pair, or None if it was not set.
+        '''
+        return self._start
+
+    def getEndCell(self):
+        '''
+        Get the end cell as a (row, col) pair, or None if it was not set.
+        '''
+        return self._end
+
+    def getGenerationParams(self):
+        '''
+        Get the generation parameters like WorldModel.getGenerationParams().
+        '''
+        if self._generationParams is None:
+            return None
+        return dict(self._generationParams)
+
+    def isObstacle(self, row, col):
+        '''
+        Checks the obstacle bit of [row,col] without unpacking anything.
+        '''
+        if not (0 <= row < self._numRows and 0 <= col < self._numCols):
+            raise ValueError('{0},{1} is outside of the world'.format(row, col))
+        packed = self._map[self._gridOffset + row * self._rowBytes + (col >> 3)]
+        return (packed >> (col & 7)) & 1 == 1
+
+    def getObstacleRows(self, firstRow, endRow):
+        '''
+        Unpacks the rows from firstRow up to, but not including, endRow into
+        row major obstacle flags like WorldModel.getObstacleGrid().
+        '''
+        numCols = self._numCols
+        rowBytes = self._rowBytes
+        obstacles = bytearray()
+        if numCols == 0:
+            return obstacles
+        offset = self._gridOffset + firstRow * rowBytes
+        for _ in range(firstRow, endRow):
+            bits = int.from_bytes(self._map[offset:offset + rowBytes], 'little')
+            #The binary digits list the last cell first
+            digits = format(bits, '0{0}b'.format(rowBytes * 8))
+            obstacles += digits[:-numCols - 1:-1].encode('ascii').translate(_BITS_TO_FLAGS)
+            offset += rowBytes
+        return obstacles
+
+    def getLandmarks(self):
+        '''
+        Get the cells of the stored landmark tables as (row, col) pairs.
+        '''
+        offset = self._landmarkOffset
+        cells = array('i')
+        cells.frombytes(self._map[offset:offset + self._numLandmarks * 8])
+        if sys.byteorder != 'little':
+            cells.byteswap()
+        return [(cells[pos], cells[pos + 1]) for pos in range(0, len(cells), 2)]
+
+    def getLandmarkTables(self):
+        '''
+        Get copies of the stored landmark tables like
+        heuristics.LandmarkHeuristic.getTables().
+        '''
+        tableBytes = self._numRows * self._numCols * array('d').itemsize
+        offset = self._landmarkOffset + self._numLandmarks * 8
+        tables = []
+        for _ in range(0, self._numLandmarks):
+            table = array('d')
+            table.frombytes(self._map[offset:offset + tableBytes])
+            if sys.byteorder != 'little':
+                table.byteswap()
+            tables.append(table)
+            offset += tableBytes
+        return tables
+
+    def toWorldModel(self):
+        '''
+        Creates a WorldModel with the file's obstacles, start and end cells
+        and generation parameters.  Stored landmark tables are handed to the
+        model for the LandmarkHeuristic with as many landmarks to use.
+        '''
+        world = model.WorldModel(self._numRows, self._numCols)
+        world.setObstacleGrid(self.getObstacleRows(0, self._numRows))
+        if self._start is not None:
+            world.setStartCell(*self._start)
+        if self._end is not None:
+            world.setEndCell(*self._end)
+        world.setGenerationParams(self._generationParams)
+        if self._landmarkKey > 0:
+            world.setDerivedData(('landmarks', self._landmarkKey),
+                                 list(zip(self.getLandmarks(), self.getLandmarkTables())))
+        return world
@@ -0,0 +1,224 @@
+import os
+import random
+import sys
+import unittest
+from math import sqrt
+
+#Allow the tests to import the application modules directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/reverseastar')
+
+import algorithm
+import anytime
+import bidirectional
+import distancefield
+import heuristics
+import hierarchical
+import incremental
+import jps
+import model
+import pathcache
+
+#Costs added up along different paths round differently
+_TOLERANCE = 1e-9
+
+def buildWorlds(count, firstSeed=0):
+    '''
+    Yields seeded worlds of assorted sizes and densities.  Every third world
+    gets a random end cell, so some of them are unsolvable.
+    '''
+    for seed in range(firstSeed, firstSeed + count):
+        rng = random.Random(seed)
+        world = model.WorldModel(rng.randint(8, 45), rng.randint(8, 45))
+        world.reset(rng.choice((0.1, 0.2, 0.3, 0.4)), seed=seed)
+        if seed % 3 == 0:
+            world.setEndCell(rng.randrange(world.getNumRows()), rng.randrange(world.getNumColumns()))
+        yield seed, world
+
+def referenceCost(world):
+    '''
+    Returns the cost plain Reverse A* finds for the world, or None.
+    '''
+    alg = algorithm.ReverseAStarAlgorithm(world)
+    alg.reset()
+    return alg.solve()[1]
+
+class EngineTestCase(unittest.TestCase):
+
+    def assertValidPath(self, world, path, cost):
+        '''
+        Checks that the path leads from the start cell to the end cell over
+        open cells with legal moves that add up to the cost.
+        '''
+        start = world.getStartCell()
+        end = world.getEndCell()
+        self.assertEqual((path[0], path[1]), (start.row, start.column))
+        self.assertEqual((path[-2], path[-1]), (end.row, end.column))
+        total = 0.0
+        for pos in range(0, len(path), 2):
+            self.assertFalse(world.getCell(path[pos], path[pos + 1]).isObstacle())
+            if pos == 0:
+                continue
+            rowStep = path[pos] - path[pos - 2]
+            colStep = path[pos + 1] - path[pos - 1]
+            self.assertLessEqual(max(abs(rowStep), abs(colStep)), 1)
+            if rowStep and colStep:
+                #Diagonals need one of their corner cells to be open
+                self.assertFalse(world.getCell(path[pos - 2], path[pos + 1]).isObstacle() and
+                                 world.getCell(path[pos], path[pos - 1]).isObstacle())
+                total += sqrt(2.0)
+            else:
+                total += 1.0
+        self.assertAlmostEqual(total, cost, delta=_TOLERANCE * max(1.0, cost))
+
+class OptimalEngineTest(EngineTestCase):
+    '''
+    Every engine that promises the cheapest path must find the cost plain
+    Reverse A* finds.
+    '''
+
+    def checkEngine(self, createEngine, numWorlds=120):
+        for seed, world in buildWorlds(numWorlds):
+            expected = referenceCost(world)
+            alg = createEngine(world)
+            alg.reset()
+            path, cost = alg.solve()
+            if expected is None:
+                self.assertIsNone(cost, 'world {0}'.format(seed))
+                self.assertFalse(alg.isSolvable())
+            else:
+                self.assertIsNotNone(cost, 'world {0}'.format(seed))
+                self.assertAlmostEqual(cost, expected, delta=_TOLERANCE * expected,
+                                       msg='world {0}'.format(seed))
+                self.assertValidPath(world, path, cost)
+
+    def testJumpPointSearch(self):
+        self.checkEngine(jps.JumpPointSearch)
+
+    def testBidirectional(self):
+        self.checkEngine(bidirectional.BidirectionalAStar)
+
+    def testAnytime(self):
+        self.checkEngine(anytime.AnytimeReverseAStar)
+
+    def testOctileHeuristic(self):
+        self.checkEngine(lambda world: algorithm.ReverseAStarAlgorithm(
+            world, heuristic=heuristics.OctileHeuristic()))
+
+    def testLandmarkHeuristic(self):
+        self.checkEngine(lambda world: algorithm.ReverseAStarAlgorithm(
+            world, heuristic=heuristics.LandmarkHeuristic(world, 4)), 40)
+
+    def testSteps(self):
+        '''
+        Stepping the search, with or without stats, ends with the same path
+        as solve().
+        '''
+        for seed, world in buildWorlds(40):
+            expected = referenceCost(world)
+            for stats in (None, algorithm.SearchStats()):
+                alg = algorithm.ReverseAStarAlgorithm(world, stats)
+                alg.reset()
+                while not alg.isDone() and alg.isSolvable():
+                    alg.step()
+                self.assertEqual(alg.getPathCost(), expected, 'world {0}'.format(seed))
+
+    def testIncrementalAfterEdits(self):
+        '''
+        D* Lite repairs its tree after obstacle edits and start cell moves to
+        the cost a fresh search finds.
+        '''
+        rng = random.Random(1)
+        for seed, world in buildWorlds(30):
+            alg = incremental.IncrementalReverseAStar(world)
+            for edit in range(20):
+                for _ in range(rng.randint(1, 4)):
+                    row = rng.randrange(world.getNumRows())
+                    col = rng.randrange(world.getNumColumns())
+                    world.setObstacle(row, col, not world.getCell(row, col).isObstacle())
+                if edit % 7 == 3:
+                    world.setStartCell(rng.randrange(world.getNumRows()),
+                                       rng.randrange(world.getNumColumns()))
+                path, cost = alg.solve()
+                expected = referenceCost(world)
+                if expected is None:
+                    self.assertIsNone(cost, 'world {0} edit {1}'.format(seed, edit))
+                else:
+                    self.assertAlmostEqual(cost, expected, delta=_TOLERANCE * expected,
+                                           msg='world {0} edit {1}'.format(seed, edit))
+                    self.assertValidPath(world, path, cost)
+            alg.detach()
+
+    def testDistanceField(self):
+        for seed, world in buildWorlds(60):
+            expected = referenceCost(world)
+            field = distancefield.DistanceField(world)
+            start = world.getStartCell()
+            path = field.getPath(start.row, start.column)
+            if expected is None:
+                self.assertIsNone(path, 'world {0}'.format(seed))
+            else:
+                cost = field.getDistance(start.row, start.column)
+                self.assertAlmostEqual(cost, expected, delta=_TOLERANCE * expected)
+                self.assertValidPath(world, path, cost)
+            field.detach()
+
+    def testPathCache(self):
+        for seed, world in buildWorlds(30):
+            cache = pathcache.PathCache(world)
+            expected = referenceCost(world)
+            for _ in range(2):
+                path, cost = cache.solve()
+                self.assertEqual(cost, expected, 'world {0}'.format(seed))
+            self.assertEqual(cache.hits, 1)
+
+class HierarchicalTest(EngineTestCase):
+
+    def testPaths(self):
+        '''
+        HPA* paths are not always the cheapest, but exist exactly when plain
+        Reverse A* finds one and never cost less.
+        '''
+        for seed, world in buildWorlds(60):
+            expected = referenceCost(world)
+            finder = hierarchical.HierarchicalPathfinder(world, 8)
+            path, cost = finder.solve()
+            if expected is None:
+                self.assertIsNone(cost, 'world {0}'.format(seed))
+            else:
+                self.assertGreaterEqual(cost, expected - _TOLERANCE * expected)
+                self.assertValidPath(world, path, cost)
+            finder.detach()
+
+class BlockedEndpointTest(unittest.TestCase):
+    '''
+    Start or end cells inside an obstacle are unsolvable for every engine.
+    '''
+
+    def testEngines(self):
+        world = model.WorldModel(33, 33)
+        world.reset(0.3, seed=7)
+        blocked = world.getObstacleGrid().index(1)
+        row, col = divmod(blocked, 33)
+        start = world.getStartCell()
+        end = world.getEndCell()
+        for endpoints in (((row, col), (end.row, end.column)),
+                          ((start.row, start.column), (row, col)),
+                          ((row, col), (row, col))):
+            world.setStartCell(*endpoints[0])
+            world.setEndCell(*endpoints[1])
+            self.assertFalse(world.isSolvable())
+            for engine in (algorithm.ReverseAStarAlgorithm, anytime.AnytimeReverseAStar,
+                           bidirectional.BidirectionalAStar, jps.JumpPointSearch):
+                alg = engine(world)
+                alg.reset()
+                self.assertEqual(alg.solve(), (None, None), engine.__name__)
+                self.assertFalse(alg.isSolvable(), engine.__name__)
+            alg = incremental.IncrementalReverseAStar(world)
+            self.assertEqual(alg.solve(), (None, None))
+            alg.detach()
+            finder = hierarchical.HierarchicalPathfinder(world)
+            self.assertEqual(finder.solve(), (None, None))
+            finder.detach()
+
+if __name__ == '__main__':
+    unittest.main()
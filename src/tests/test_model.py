@@ -0,0 +1,140 @@
+import os
+import random
+import sys
+import unittest
+
+#Allow the tests to import the application modules directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/reverseastar')
+
+import algorithm
+import model
+
+def randomGrid(rng, numRows, numCols, density=0.4):
+    return bytes(bytearray(1 if rng.random() < density else 0
+                           for _ in range(numRows * numCols)))
+
+def rebuiltWorld(world):
+    '''
+    Creates a world with the same obstacles whose labels and masks were
+    never patched.
+    '''
+    rebuilt = model.WorldModel(world.getNumRows(), world.getNumColumns())
+    rebuilt.setObstacleGrid(world.getObstacleGrid())
+    return rebuilt
+
+class ComponentLabelTest(unittest.TestCase):
+
+    def assertSameRegions(self, world, rebuilt):
+        '''
+        Checks that both worlds split the open cells into the same regions,
+        although their label numbers may differ.
+        '''
+        numbering = {}
+        for row in range(0, world.getNumRows()):
+            for col in range(0, world.getNumColumns()):
+                label = world.getComponentLabel(row, col)
+                expected = rebuilt.getComponentLabel(row, col)
+                self.assertEqual(label == 0, expected == 0)
+                self.assertEqual(numbering.setdefault(label, expected), expected)
+        self.assertEqual(len(set(numbering.values())), len(numbering))
+
+    def testLabelsAfterEdits(self):
+        '''
+        Labels kept up to date by setObstacle() match labels computed from
+        scratch.
+        '''
+        for seed in range(0, 60):
+            rng = random.Random(seed)
+            numRows = rng.randint(1, 25)
+            numCols = rng.randint(1, 25)
+            world = model.WorldModel(numRows, numCols)
+            world.setObstacleGrid(randomGrid(rng, numRows, numCols))
+            world.getComponentLabel(0, 0)
+            for _ in range(0, 40):
+                world.setObstacle(rng.randrange(numRows), rng.randrange(numCols), rng.random() < 0.5)
+                self.assertSameRegions(world, rebuiltWorld(world))
+
+    def testDiagonalCorners(self):
+        '''
+        Cells touching only at a corner with both corner cells blocked are
+        not connected.
+        '''
+        world = model.WorldModel(2, 2)
+        world.setObstacleGrid(b'\x00\x01\x01\x00')
+        self.assertFalse(world.areConnected(0, 0, 1, 1))
+        world.setObstacle(0, 1, False)
+        self.assertTrue(world.areConnected(0, 0, 1, 1))
+
+    def testUnsolvableWithoutSearch(self):
+        '''
+        A loaded world whose endpoints are in different regions is known to be
+        unsolvable before a single cell is expanded.
+        '''
+        numRows = numCols = 60
+        grid = bytearray(numRows * numCols)
+        for row in range(0, numRows):
+            grid[row * numCols + numCols // 2] = 1
+        world = model.WorldModel(numRows, numCols)
+        world.setObstacleGrid(grid)
+        world.setStartCell(0, 0)
+        world.setEndCell(numRows - 1, numCols - 1)
+        alg = algorithm.ReverseAStarAlgorithm(world)
+        alg.reset()
+        self.assertFalse(alg.isSolvable())
+        self.assertEqual(alg.getNumVisitedCells(), 0)
+
+        world.setObstacle(numRows // 2, numCols // 2, False)
+        self.assertTrue(world.isSolvable())
+
+class MoveMaskTest(unittest.TestCase):
+
+    def testMasksAfterEdits(self):
+        '''
+        Move masks patched by setObstacle() match masks computed from
+        scratch, and obstacles have none.
+        '''
+        for seed in range(0, 30):
+            rng = random.Random(seed)
+            numRows = rng.randint(1, 20)
+            numCols = rng.randint(1, 20)
+            world = model.WorldModel(numRows, numCols)
+            world.setObstacleGrid(randomGrid(rng, numRows, numCols))
+            world.getMoveMasks()
+            for _ in range(0, 30):
+                world.setObstacle(rng.randrange(numRows), rng.randrange(numCols), rng.random() < 0.5)
+            masks = world.getMoveMasks()
+            self.assertEqual(masks, rebuiltWorld(world).getMoveMasks())
+            for index, obstacle in enumerate(world.getObstacleGrid()):
+                if obstacle:
+                    self.assertEqual(masks[index], 0)
+
+class VersionTest(unittest.TestCase):
+
+    def testVersion(self):
+        world = model.WorldModel(10, 10)
+        world.reset(0.3, seed=1)
+        version = world.getVersion()
+        world.setDerivedData('key', 1)
+
+        #Setting a cell to the value it has changes nothing
+        world.setObstacle(0, 0, world.getCell(0, 0).isObstacle())
+        self.assertEqual(world.getVersion(), version)
+        self.assertEqual(world.getDerivedData('key'), 1)
+
+        world.setObstacle(0, 0, not world.getCell(0, 0).isObstacle())
+        self.assertGreater(world.getVersion(), version)
+        self.assertIsNone(world.getDerivedData('key'))
+
+    def testSeededWorlds(self):
+        first = model.WorldModel(40, 40)
+        first.reset(0.3, seed=5)
+        second = model.WorldModel(40, 40)
+        second.reset(0.3, seed=5)
+        self.assertEqual(first.getObstacleGrid(), second.getObstacleGrid())
+        self.assertEqual(first.getGenerationParams()['seed'], 5)
+
+        first.reset(0.3, seed=True)
+        self.assertIsNone(first.getGenerationParams()['seed'])
+
+if __name__ == '__main__':
+    unittest.main()
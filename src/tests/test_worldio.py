@@ -0,0 +1,115 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+#Allow the tests to import the application modules directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + '/reverseastar')
+
+import heuristics
+import model
+import worldio
+
+class WorldFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'world.rasw')
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
+
+    def assertSameWorld(self, world, loaded):
+        self.assertEqual(loaded.getNumRows(), world.getNumRows())
+        self.assertEqual(loaded.getNumColumns(), world.getNumColumns())
+        self.assertEqual(loaded.getObstacleGrid(), world.getObstacleGrid())
+        self.assertEqual(loaded.getGenerationParams(), world.getGenerationParams())
+        for cell, loadedCell in ((world.getStartCell(), loaded.getStartCell()),
+                                 (world.getEndCell(), loaded.getEndCell())):
+            if cell is None:
+                self.assertIsNone(loadedCell)
+            else:
+                self.assertEqual((loadedCell.row, loadedCell.column), (cell.row, cell.column))
+
+    def testRoundTrip(self):
+        for seed in range(0, 40):
+            rng = random.Random(seed)
+            numRows = rng.randint(1, 40)
+            numCols = rng.randint(1, 40)
+            world = model.WorldModel(numRows, numCols)
+            if seed % 3:
+                world.reset(0.3, seed=seed if seed % 2 else None)
+            else:
+                world.setObstacleGrid(bytes(bytearray(1 if rng.random() < 0.4 else 0
+                                                      for _ in range(numRows * numCols))))
+            worldio.writeWorld(world, self._path)
+            self.assertSameWorld(world, worldio.readWorld(self._path))
+
+            with worldio.WorldFile(self._path) as worldFile:
+                grid = world.getObstacleGrid()
+                for _ in range(0, 20):
+                    row = rng.randrange(numRows)
+                    col = rng.randrange(numCols)
+                    self.assertEqual(worldFile.isObstacle(row, col), bool(grid[row * numCols + col]))
+                self.assertEqual(worldFile.getObstacleRows(1, numRows), grid[numCols:])
+
+    def testLargeSeed(self):
+        '''
+        Seeds that do not fit the header are left out, the world is still
+        written.
+        '''
+        world = model.WorldModel(20, 20)
+        for seed in (2 ** 70, 2 ** 64 - 1):
+            world.reset(0.3, seed=seed)
+            worldio.writeWorld(world, self._path)
+            loaded = worldio.readWorld(self._path)
+            self.assertEqual(loaded.getObstacleGrid(), world.getObstacleGrid())
+            self.assertIsNone(loaded.getGenerationParams()['seed'])
+
+    def testLandmarks(self):
+        world = model.WorldModel(30, 30)
+        world.reset(0.3, seed=3)
+        worldio.writeWorld(world, self._path, numLandmarks=4)
+        with worldio.WorldFile(self._path) as worldFile:
+            loaded = worldFile.toWorldModel()
+            self.assertEqual(len(worldFile.getLandmarks()), 4)
+        self.assertIsNotNone(loaded.getDerivedData(('landmarks', 4)))
+
+        #The stored tables are used instead of computing them again, and they
+        #match tables computed from scratch
+        stored = heuristics.LandmarkHeuristic(loaded, 4)
+        computed = heuristics.LandmarkHeuristic(world, 4)
+        start = world.getStartCell()
+        end = world.getEndCell()
+        startIndex = world.getCellIndex(start.row, start.column)
+        endIndex = world.getCellIndex(end.row, end.column)
+        self.assertEqual(stored.bind(loaded, endIndex)(startIndex),
+                         computed.bind(world, endIndex)(startIndex))
+
+    def testBadFiles(self):
+        for data in (b'', b'xxxx' * 20):
+            with open(self._path, 'wb') as worldFile:
+                worldFile.write(data)
+            self.assertRaises(ValueError, worldio.readWorld, self._path)
+
+        world = model.WorldModel(100, 100)
+        world.reset(0.3, seed=1)
+        worldio.writeWorld(world, self._path)
+        with open(self._path, 'rb') as worldFile:
+            data = worldFile.read()
+        with open(self._path, 'wb') as worldFile:
+            worldFile.write(data[:200])
+        self.assertRaises(ValueError, worldio.readWorld, self._path)
+
+    def testAsciiMap(self):
+        with open(self._path, 'w') as mapFile:
+            mapFile.write('type octile\nheight 3\nwidth 4\nmap\n..@.\n.T..\n#...\n')
+        world = worldio.readAsciiMap(self._path)
+        self.assertEqual((world.getNumRows(), world.getNumColumns()), (3, 4))
+        self.assertEqual(bytes(world.getObstacleGrid()),
+                         b'\x00\x00\x01\x00\x00\x01\x00\x00\x01\x00\x00\x00')
+
+if __name__ == '__main__':
+    unittest.main()